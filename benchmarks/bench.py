@@ -0,0 +1,336 @@
+"""Benchmark the dash and excel planners on synthetic timetables.
+
+    python benchmarks/bench.py --sizes 100 1000 10000 --overlap 0.3
+
+Every stage is timed (fastest of --repeat runs) and its peak traced memory
+is measured in one extra run. Results are saved as json per commit to
+benchmarks/results, --compare prints the change against an earlier file.
+"""
+import argparse
+import datetime as dt
+import json
+import math
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable
+
+import pandas as pd
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+sys.path.insert(0, str(ROOT))
+
+from generate import generate_timetable, write_liste  # noqa: E402
+
+Stage = tuple[str, Callable[[dict], None]]
+
+
+def run_stages(stages: list[Stage], repeat: int) -> dict[str, dict]:
+    """Run a pipeline and measure every stage.
+
+    Args:
+        stages (list[Stage]): (name, function) pairs. The functions share a
+            dict to pass results to the next stage.
+        repeat (int): number of timed runs
+
+    Returns:
+        dict[str, dict]: seconds and peak MiB of every stage
+    """
+    results = {name: {"seconds": math.inf} for name, _ in stages}
+    for run in range(repeat + 1):
+        # the last run traces memory, which slows everything down
+        trace = run == repeat
+        context: dict = {}
+        for name, stage in stages:
+            if trace:
+                tracemalloc.start()
+            start = time.perf_counter()
+            stage(context)
+            seconds = time.perf_counter() - start
+            if trace:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                results[name]["peak_mib"] = round(peak / 2**20, 3)
+            else:
+                results[name]["seconds"] = min(
+                    results[name]["seconds"], seconds
+                )
+    return results
+
+
+def dash_stages(timetable: pd.DataFrame) -> list[Stage]:
+    """Get the stages of the dash planner.
+
+    The tables are saved to the store of the app, the patch stage edits one
+    row there and renders the plan again like the "Create Plan" button.
+
+    Args:
+        timetable (pd.DataFrame): events in the schema of timetable.csv
+
+    Returns:
+        list[Stage]: load, parse, layout, figure, serialize and patch
+    """
+    import itertools
+
+    import numpy as np
+    from dash import Patch
+
+    import dash_app.callbacks as cb
+    from src.metrics import StageTimer
+    from src.schedule import ScheduleFrame
+
+    for name, df in [
+        ("timetable", timetable),
+        ("font_size", pd.read_csv(ROOT / "font_size.csv")),
+    ]:
+        cb.store.save(name, df.assign(**{cb.ROW_ID: range(len(df))}))
+    date_str = "2024-01-01"
+    widths = [1] * 7
+    day_widths = [
+        {"props": {"children": {"props": {"value": width}}}}
+        for width in widths
+    ]
+    day_offset = np.insert(np.cumsum(widths), 0, 0)
+    # every run moves another event, so the table changes every time
+    rows = itertools.count(len(timetable) // 2)
+
+    def load(ctx):
+        tt_df, ctx["fs_df"] = cb.load_tables()
+        ctx["data"] = cb.to_records(tt_df)
+
+    def parse(ctx):
+        frame = ScheduleFrame.from_timetable(
+            pd.DataFrame(ctx["data"]), cb.DEFAULT_COLORS
+        )
+        ctx["order"] = np.lexsort((frame.end, frame.start))
+        ctx["frame"] = frame.take(ctx["order"])
+
+    def layout(ctx):
+        ctx["frame"].layout()
+
+    def figure(ctx):
+        data, fs_df = ctx["data"], ctx["fs_df"]
+        settings = cb.hash_inputs(
+            cb.to_records(fs_df), "01 2024", 7, widths, 1800, 600, 60
+        )
+        trace, trace_pos, trace_len = cb.location_traces(ctx["frame"])
+        ctx["state"] = cb.RenderState(
+            settings=settings,
+            data=data,
+            frame=ctx["frame"],
+            day_offset=day_offset,
+            fs_table=tuple(
+                fs_df[["Dauer", "Schriftgröße"]].itertuples(
+                    index=False, name=None
+                )
+            ),
+            row_pos={
+                data[r][cb.ROW_ID]: i for i, r in enumerate(ctx["order"])
+            },
+            trace=trace,
+            trace_pos=trace_pos,
+            trace_len=trace_len,
+            sel_week="01 2024",
+            end_day_val=7,
+            width=1800,
+            height=600,
+        )
+        ctx["fig"] = cb.build_figure(ctx["state"])
+
+    def serialize(ctx):
+        ctx["fig"].to_json()
+        # like render_chart, keep the state for the next render
+        ctx["key"] = cb.hash_inputs(ctx["data"], ctx["state"].settings)
+        cb.remember_render(ctx["key"], ctx["state"])
+
+    def patch(ctx):
+        # move one event to the time of the first one
+        data = ctx["data"]
+        row = dict(data[next(rows) % len(data)])
+        row.update(Startzeit=data[0]["Startzeit"], Endzeit=data[0]["Endzeit"])
+        cb.store.edit_rows("timetable", [row])
+        fig, _ = cb.render_chart(
+            lambda progress: None,
+            StageTimer(),
+            date_str,
+            7,
+            day_widths,
+            1800,
+            600,
+            60,
+            ctx["key"],
+        )
+        if not isinstance(fig, Patch):
+            raise RuntimeError("editing one row rebuilt the whole figure")
+
+    return [
+        ("load", load),
+        ("parse", parse),
+        ("layout", layout),
+        ("figure", figure),
+        ("serialize", serialize),
+        ("patch", patch),
+    ]
+
+
+def excel_stages(liste: pathlib.Path, out_dir: pathlib.Path) -> list[Stage]:
+    """Get the stages of the excel planner.
+
+    Without a Template.xlsx the plan is written into an empty sheet.
+
+    Args:
+        liste (pathlib.Path): input workbook
+        out_dir (pathlib.Path): directory for the output workbook
+
+    Returns:
+        list[Stage]: read, reread (from the sidecar), layout, template,
+            write and save
+    """
+    import src.go as go
+
+    def read(ctx):
+        go.sidecar_path(liste).unlink(missing_ok=True)
+        ctx["df"], ctx["date"] = go.read_input(liste)
+
+    def reread(ctx):
+        ctx["df"], ctx["date"] = go.read_input(liste)
+
+    def layout(ctx):
+        ctx["plan"] = go.Plan.from_liste(ctx["df"])
+
+    def template(ctx):
+        if go.TEMPLATE_PATH.is_file():
+            ctx["template"] = go.load_template()["Wochenplan"]
+        else:
+            ctx["template"] = None
+
+    def write(ctx):
+        ctx["grid"] = ctx["plan"].grid()
+        ctx["grid"].values[2, 1] = go.week_text(ctx["date"])
+
+    def save(ctx):
+        ctx["grid"].save(out_dir / "Ergebnis.xlsx", ctx["template"])
+
+    return [
+        ("read", read),
+        ("reread", reread),
+        ("layout", layout),
+        ("template", template),
+        ("write", write),
+        ("save", save),
+    ]
+
+
+def git_commit() -> str:
+    """Get the short hash of the checked out commit.
+
+    Returns:
+        str: commit hash, "unknown" outside of git
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(old: dict, new: dict) -> None:
+    """Print the change of every stage between two result files.
+
+    Args:
+        old (dict): earlier results
+        new (dict): current results
+    """
+    print(f"\n{old['commit']} -> {new['commit']}")
+    for size, pipelines in new["results"].items():
+        for pipeline, stages in pipelines.items():
+            for stage, result in stages.items():
+                before = (
+                    old["results"].get(size, {}).get(pipeline, {}).get(stage)
+                )
+                if before is None:
+                    continue
+                change = result["seconds"] / before["seconds"] - 1
+                print(
+                    f"{size:>7} {pipeline:<6}{stage:<10}"
+                    f"{before['seconds']:9.4f}s {result['seconds']:9.4f}s"
+                    f" {change:+7.1%}"
+                )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100, 1000, 10000]
+    )
+    parser.add_argument("--overlap", type=float, default=0.3)
+    parser.add_argument("--weekdays", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--pipelines",
+        nargs="+",
+        choices=["dash", "excel"],
+        default=["dash", "excel"],
+    )
+    parser.add_argument(
+        "--compare", type=pathlib.Path, help="earlier result file"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = pathlib.Path(tmp)
+        # the dash app keeps its database and caches in the working directory
+        os.environ.setdefault("PLANNER_CACHE_DIR", str(tmp_dir / "cache"))
+        os.chdir(tmp_dir)
+        results: dict[str, dict] = {}
+        for size in args.sizes:
+            timetable = generate_timetable(
+                size, args.overlap, args.weekdays, seed=size
+            )
+            liste = tmp_dir / f"Liste_{size}.xlsx"
+            write_liste(timetable, liste, dt.date.today())
+            pipelines = {
+                "dash": lambda: dash_stages(timetable),
+                "excel": lambda: excel_stages(liste, tmp_dir),
+            }
+            results[str(size)] = {}
+            for pipeline in args.pipelines:
+                stages = run_stages(pipelines[pipeline](), args.repeat)
+                results[str(size)][pipeline] = stages
+                for stage, result in stages.items():
+                    print(
+                        f"{size:>7} {pipeline:<6}{stage:<10}"
+                        f"{result['seconds']:9.4f}s"
+                        f"{result['peak_mib']:10.2f} MiB"
+                    )
+        if "dash_app.callbacks" in sys.modules:
+            # write the edited tables before their directory is removed
+            sys.modules["dash_app.callbacks"].store.flush()
+
+    report = {
+        "commit": git_commit(),
+        "date": dt.datetime.now().isoformat(timespec="seconds"),
+        "overlap": args.overlap,
+        "weekdays": args.weekdays,
+        "results": results,
+    }
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    path = RESULTS_DIR / f"{report['commit']}.json"
+    path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Saved results to {path}")
+    if args.compare is not None:
+        compare(json.loads(args.compare.read_text(encoding="utf-8")), report)
+
+
+if __name__ == "__main__":
+    main()
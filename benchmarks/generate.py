@@ -0,0 +1,205 @@
+"""Generate synthetic timetables for benchmarks.
+
+Writes a timetable.csv for the dash planner and a Liste.xlsx with the sheets
+"Liste" and "KW" for the excel planner:
+    python benchmarks/generate.py -n 5000 --overlap 0.4 --out-dir bench_data
+"""
+import argparse
+import datetime as dt
+import pathlib
+
+import numpy as np
+import openpyxl as xl
+import pandas as pd
+
+WEEKDAYS = [
+    "Montag",
+    "Dienstag",
+    "Mittwoch",
+    "Donnerstag",
+    "Freitag",
+    "Samstag",
+    "Sonntag",
+]
+LOCATIONS = ["Rüsselsheim", "WBS", "Online"]
+ROOMS = {"Rüsselsheim": "G-0", "WBS": "II-0", "Online": ""}
+SUBJECTS = ["Mathe", "Physik", "Informatik", "Chemie", "BWL", "Statistik"]
+NAMES = ["Marco", "Lena", "Paul", "Anna", "Jonas", "Mia", "Ali", "Sofia"]
+# the excel planner spells some locations differently
+LISTE_LOCATIONS = {"Online": "online"}
+DAY_START = 8 * 60
+DAY_END = 20 * 60
+STEP = 15
+# number formats of the real input workbook
+TIME_FORMAT = "h:mm"
+DATE_FORMAT = "dd.mm.yyyy"
+
+
+def format_minutes(minutes: np.ndarray) -> np.ndarray:
+    """Format minutes since midnight as "H:MM".
+
+    Args:
+        minutes (np.ndarray): minutes since midnight
+
+    Returns:
+        np.ndarray: formatted times
+    """
+    return np.array([f"{m // 60}:{m % 60:02}" for m in minutes.tolist()])
+
+
+def generate_timetable(
+    n_events: int,
+    overlap: float = 0.3,
+    weekdays: int = 5,
+    locations: list[str] | None = None,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """Generate a timetable in the schema of timetable.csv.
+
+    Every weekday is filled like a tutor schedule: an event either follows
+    the previous one or, with probability overlap, starts while the previous
+    one still runs. Events that would end after DAY_END start over at
+    DAY_START, so large timetables get many parallel lanes.
+
+    Args:
+        n_events (int): number of events
+        overlap (float, optional): probability that an event overlaps the
+            previous one on its day. Defaults to 0.3.
+        weekdays (int, optional): number of weekdays from monday.
+            Defaults to 5.
+        locations (list[str] | None, optional): locations to use.
+            Defaults to LOCATIONS.
+        seed (int, optional): random seed. Defaults to 0.
+
+    Returns:
+        pd.DataFrame: events with the columns Tag, Startzeit, Endzeit,
+            Tutor:in, Schwerpunkt, Ort, Raum and color
+    """
+    rng = np.random.default_rng(seed)
+    locations = LOCATIONS if locations is None else locations
+    day = np.sort(rng.integers(0, weekdays, n_events))
+    duration = STEP * rng.integers(2, 17, n_events)
+    overlaps = rng.random(n_events) < overlap
+    gap = STEP * rng.integers(0, 3, n_events)
+    start = np.empty(n_events, dtype=np.int64)
+    prev_day, prev_start, prev_end = -1, DAY_START, DAY_START
+    for i in range(n_events):
+        if day[i] != prev_day:
+            begin = DAY_START
+        elif overlaps[i]:
+            begin = prev_start + STEP * rng.integers(
+                0, max(1, (prev_end - prev_start) // STEP)
+            )
+        else:
+            begin = prev_end + gap[i]
+        if begin + duration[i] > DAY_END:
+            begin = DAY_START + gap[i]
+        start[i] = begin
+        prev_day, prev_start, prev_end = day[i], begin, begin + duration[i]
+    end = start + duration
+
+    location = rng.choice(locations, n_events)
+    tutors = np.array(
+        [f"{name} {i}" for i in range(1 + n_events // 40) for name in NAMES]
+    )
+    room_numbers = rng.integers(1, 20, n_events).astype(str)
+    rooms = [
+        f"{ROOMS[loc]}{num:0>2}" if ROOMS.get(loc) else None
+        for loc, num in zip(location, room_numbers)
+    ]
+    return pd.DataFrame(
+        {
+            "Tag": np.array(WEEKDAYS)[day],
+            "Startzeit": format_minutes(start),
+            "Endzeit": format_minutes(end),
+            "Tutor:in": rng.choice(tutors, n_events),
+            "Schwerpunkt": rng.choice(SUBJECTS, n_events),
+            "Ort": location,
+            "Raum": rooms,
+            "color": None,
+        }
+    )
+
+
+def to_liste(timetable: pd.DataFrame) -> pd.DataFrame:
+    """Convert a timetable to the schema of the sheet "Liste".
+
+    Args:
+        timetable (pd.DataFrame): events from generate_timetable()
+
+    Returns:
+        pd.DataFrame: events with the columns Tag, Anfangszeit, Endzeit,
+            Tutor, SP1, SP2 and Ort
+    """
+    return pd.DataFrame(
+        {
+            "Tag": timetable["Tag"],
+            "Anfangszeit": pd.to_datetime(
+                timetable["Startzeit"], format="%H:%M"
+            ).dt.time,
+            "Endzeit": pd.to_datetime(
+                timetable["Endzeit"], format="%H:%M"
+            ).dt.time,
+            "Tutor": timetable["Tutor:in"],
+            "SP1": timetable["Schwerpunkt"],
+            "SP2": timetable["Schwerpunkt"].sample(frac=1, random_state=0)
+            .to_numpy(),
+            "Ort": timetable["Ort"].replace(LISTE_LOCATIONS),
+        }
+    )
+
+
+def write_liste(
+    timetable: pd.DataFrame, path: pathlib.Path, date: dt.date
+) -> None:
+    """Write the input workbook of the excel planner.
+
+    Times and the date are written as excel time and date cells, like in
+    the real Liste.xlsm.
+
+    Args:
+        timetable (pd.DataFrame): events from generate_timetable()
+        path (pathlib.Path): path to the workbook
+        date (dt.date): a date in the week of the plan
+    """
+    liste = to_liste(timetable)
+    wb = xl.Workbook()
+    ws = wb.active
+    ws.title = "Liste"
+    ws.append(liste.columns.tolist())
+    for row in liste.itertuples(index=False, name=None):
+        ws.append(row)
+    for column in ("Anfangszeit", "Endzeit"):
+        col = liste.columns.get_loc(column) + 1
+        for (cell,) in ws.iter_rows(min_row=2, min_col=col, max_col=col):
+            cell.number_format = TIME_FORMAT
+    kw = wb.create_sheet("KW")
+    kw.append(["Datum"])
+    kw.append([dt.datetime.combine(date, dt.time())])
+    kw["A2"].number_format = DATE_FORMAT
+    wb.save(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--events", type=int, default=1000)
+    parser.add_argument("--overlap", type=float, default=0.3)
+    parser.add_argument("--weekdays", type=int, default=5)
+    parser.add_argument("--locations", nargs="+", default=LOCATIONS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--out-dir", type=pathlib.Path, default=pathlib.Path.cwd()
+    )
+    args = parser.parse_args()
+
+    timetable = generate_timetable(
+        args.events, args.overlap, args.weekdays, args.locations, args.seed
+    )
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    timetable.to_csv(args.out_dir / "timetable.csv", index=False)
+    write_liste(timetable, args.out_dir / "Liste.xlsx", dt.date.today())
+    print(f"Wrote {len(timetable)} events to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
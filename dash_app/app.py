@@ -1,11 +1,27 @@
 import dash
 import dash_bootstrap_components as dbc
-from dash import dcc, html
+import diskcache
+from dash import DiskcacheManager, dcc, html
 import dash_app.callbacks
+from dash_app.callbacks import CACHE_DIR
+from dash_app.export import export_plan
+from dash_app.health import health
+from dash_app.metrics import metrics, profile
+
 app = dash.Dash(
     __name__,
     use_pages=True,
     external_stylesheets=[dbc.themes.SLATE],
+    background_callback_manager=DiskcacheManager(
+        diskcache.Cache(CACHE_DIR / "background")
+    ),
+)
+
+app.server.add_url_rule("/export/<key>.<fmt>", view_func=export_plan)
+app.server.add_url_rule("/health", view_func=health)
+app.server.add_url_rule("/metrics", view_func=metrics)
+app.server.add_url_rule(
+    "/metrics/profile", view_func=profile, methods=["GET", "POST"]
 )
 
 app.layout = dbc.Container(
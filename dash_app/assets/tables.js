@@ -0,0 +1,32 @@
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    tables: {
+        /**
+         * Get the rows of a DataTable that changed with the last edit.
+         *
+         * Rows are matched by their id, so only the edited rows and the ids
+         * of deleted rows are sent to the server.
+         */
+        diff_rows: function (timestamp, data, previous) {
+            if (!data || !previous) {
+                return window.dash_clientside.no_update;
+            }
+            const before = new Map(previous.map((row) => [row.id, row]));
+            const changed = [];
+            data.forEach((row) => {
+                const old = before.get(row.id);
+                if (
+                    old === undefined ||
+                    JSON.stringify(old) !== JSON.stringify(row)
+                ) {
+                    changed.push(row);
+                }
+                before.delete(row.id);
+            });
+            return {
+                changed: changed,
+                deleted: Array.from(before.keys()),
+                timestamp: timestamp,
+            };
+        },
+    },
+});
@@ -0,0 +1,79 @@
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    ui: {
+        /** Open or close the font size control. */
+        toggle_collapse: function (n, isOpen) {
+            return n ? !isOpen : isOpen;
+        },
+
+        /** Get the ISO calendar week of a date as "WW YYYY". */
+        date_to_cw: function (dateStr) {
+            if (!dateStr) {
+                return window.dash_clientside.no_update;
+            }
+            const date = new Date(dateStr.slice(0, 10) + "T00:00:00Z");
+            // the thursday of the week decides the year of the week
+            date.setUTCDate(
+                date.getUTCDate() + 3 - ((date.getUTCDay() + 6) % 7)
+            );
+            const year = date.getUTCFullYear();
+            const jan4 = new Date(Date.UTC(year, 0, 4));
+            const week =
+                1 +
+                Math.round(
+                    ((date - jan4) / 86400000 -
+                        3 +
+                        ((jan4.getUTCDay() + 6) % 7)) /
+                        7
+                );
+            return String(week).padStart(2, "0") + " " + year;
+        },
+
+        /** Create one width input per day of the plan. */
+        day_width_fields: function (endDay) {
+            const fields = [];
+            for (let i = 0; i < (endDay || 0); i++) {
+                fields.push({
+                    namespace: "dash_bootstrap_components",
+                    type: "Col",
+                    props: {
+                        children: {
+                            namespace: "dash_core_components",
+                            type: "Input",
+                            props: {value: 1, type: "number", min: 1, step: 1},
+                        },
+                    },
+                });
+            }
+            return fields;
+        },
+
+        /** Link the exports of the plan that is shown. */
+        export_links: function (key) {
+            if (!key) {
+                return window.dash_clientside.no_update;
+            }
+            return ["png", "svg", "pdf"].map(
+                (fmt) => "/export/" + key + "." + fmt
+            );
+        },
+
+        /** Show the columns that have dropdown options as dropdowns. */
+        dropdown_columns: function (version, columns, dropdown) {
+            if (!columns) {
+                return window.dash_clientside.no_update;
+            }
+            let changed = false;
+            const result = columns.map((col) => {
+                const presentation =
+                    dropdown && dropdown[col.id] ? "dropdown" : undefined;
+                if (col.presentation !== presentation) {
+                    changed = true;
+                }
+                return presentation
+                    ? {id: col.id, name: col.id, presentation: presentation}
+                    : {id: col.id, name: col.id};
+            });
+            return changed ? result : window.dash_clientside.no_update;
+        },
+    },
+});
@@ -1,271 +1,1013 @@
-from dash import callback, Input, Output, State, ctx
+from dash import callback, Input, Output, State, ctx, no_update, Patch
+from dash import clientside_callback, ClientsideFunction
 from pathlib import Path
 import pandas as pd
 import datetime as dt
 import plotly.graph_objects as go
-import datetime
 import numpy as np
-import dash_bootstrap_components as dbc
-from dash import dcc
+from functools import lru_cache
+from dataclasses import dataclass, replace
+import base64
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import diskcache
+from dash_app.figure_cache import FigureCache, hash_inputs
+from dash_app.store import ROW_ID, TableStore
+from src.conflicts import ConflictIndex
 from src.font_size import get_text_dims
+from src.metrics import StageTimer
+from src.schedule import WEEKDAYS, ScheduleFrame, SlotIndex
+
+# background callbacks run in their own processes, so everything they share
+# with later requests is kept on disk
+CACHE_DIR = Path(os.environ.get("PLANNER_CACHE_DIR", Path.cwd() / ".cache"))
+figure_cache = FigureCache(
+    directory=Path(os.environ["FIGURE_CACHE_DIR"])
+    if "FIGURE_CACHE_DIR" in os.environ
+    else CACHE_DIR / "figures"
+)
+# the production server runs several processes, their writer threads write
+# the tables under a lock they share
+store = TableStore(
+    Path.cwd() / "planner.db",
+    lock=diskcache.RLock(
+        diskcache.Cache(CACHE_DIR / "locks"), "table-store", expire=60
+    )
+    if os.environ.get("PLANNER_SHARED_STORE")
+    else None,
+)
+TABLES = ("timetable", "font_size")
+# stage observations of all processes, collected by the /metrics route
+metrics_cache = diskcache.Cache(CACHE_DIR / "metrics", size_limit=2**26)
+PROFILE_REQUEST = "profile-request"
+PROFILE_RESULT = "profile-result"
+
+
+def publish(timer: StageTimer) -> None:
+    """Queue the observations of a run for the metrics registry.
+
+    Args:
+        timer (StageTimer): timer of the run
+    """
+    metrics_cache.push(timer.observations)
 
 
-def find_lowest_missing(arr):
-    # Sort the array
-    arr_sorted = np.sort(arr)
+def run_profiled(func, *args):
+    """Call func, under cProfile if a profile was requested.
 
-    # Check for the first gap between consecutive elements
-    for i in range(len(arr_sorted)):
-        if arr_sorted[i] != i:
-            return i
-    # If no gap found, the lowest missing value is n+1
-    return len(arr_sorted)
+    A profile is requested with a POST to /metrics/profile and only covers
+    the next call, its statistics are kept for GET /metrics/profile.
+
+    Returns:
+        result of func
+    """
+    if not metrics_cache.pop(PROFILE_REQUEST, default=False):
+        return func(*args)
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args)
+    finally:
+        stats = io.StringIO()
+        pstats.Stats(profiler, stream=stats).sort_stats(
+            "cumulative"
+        ).print_stats(40)
+        metrics_cache.set(PROFILE_RESULT, stats.getvalue())
 
 
-def read_data(table_name: str) -> tuple:
-    """Load table data and return it in a json friendly format.
+def to_records(df: pd.DataFrame) -> list:
+    """Convert a table to json friendly records, missing values as None.
+
+    Args:
+        df (pd.DataFrame): table
+
+    Returns:
+        list: list of row dicts
+    """
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def patch_rows(old: list, new: list) -> Patch:
+    """Get the row operations that turn the old records into the new ones.
+
+    Args:
+        old (list): records the client has
+        new (list): current records
+
+    Returns:
+        Patch: assignments of changed rows, appends and deletes
+    """
+    patch = Patch()
+    for i, (old_row, new_row) in enumerate(zip(old, new)):
+        if old_row != new_row:
+            patch[i] = new_row
+    for row in new[len(old) :]:
+        patch.append(row)
+    for i in reversed(range(len(new), len(old))):
+        del patch[i]
+    return patch
+
+
+def read_data(table_name: str, version: str | None = None) -> tuple:
+    """Load table data and return what changed in a json friendly format.
 
     Args:
         table_name (str): table name
+        version (str | None, optional): version of the table the client
+            has. Defaults to None.
 
     Returns:
-        list: list of data from table
+        tuple: (data, columns, version). Everything is no_update if the
+            client is up to date. If the client version is still known
+            only the changed rows are sent as a Patch.
     """
-    result = pd.read_csv(Path.cwd() / table_name)
-    assert result.size > 0
-    return result.to_dict("records"), [
-        {"name": i, "id": i} for i in result.columns
-    ]
+    timer = StageTimer("read_data.")
+    with timer.stage(table_name) as obs:
+        cur_version = store.version(table_name)
+        if version is not None and version == cur_version:
+            out = no_update, no_update, no_update
+        else:
+            old = None if version is None else store.snapshot(version)
+            result, cur_version = store.load(table_name)
+            assert result.size > 0
+            obs.rows = len(result)
+            if old is not None and list(old.columns) == list(result.columns):
+                out = (
+                    patch_rows(to_records(old), to_records(result)),
+                    no_update,
+                    cur_version,
+                )
+            else:
+                out = (
+                    to_records(result),
+                    [
+                        {"name": i, "id": i}
+                        for i in result.columns
+                        if i != ROW_ID
+                    ],
+                    cur_version,
+                )
+    publish(timer)
+    return out
+
+
+def save_edits(table_name: str, edits: dict, version: str | None) -> tuple:
+    """Apply the row edits of a client to the stored table.
+
+    Args:
+        table_name (str): table name
+        edits (dict): "changed" rows and ids of "deleted" rows
+        version (str | None): version of the table the client edited
+
+    Returns:
+        tuple: (data, version). data is only sent if the table changed
+            since the client version, otherwise the client already has it.
+    """
+    before = store.version(table_name)
+    after = store.edit_rows(table_name, edits["changed"], edits["deleted"])
+    if version == before:
+        return no_update, after
+    # row positions of the client only match its version without deletes
+    data, _, after = read_data(
+        table_name, None if edits["deleted"] else version
+    )
+    return data, after
+
+
+conflicts = ConflictIndex()
+conflicts_lock = threading.Lock()
+CONFLICT_COLUMNS = {"tutor": "Tutor:in", "room": "Raum"}
+CONFLICT_COLOR = "#F8CBAD"
+
+
+def row_booking(row: dict) -> tuple | None:
+    """Get the booking of a timetable row for the conflict index.
+
+    Rooms are only compared within the same Ort.
+
+    Args:
+        row (dict): timetable row
+
+    Returns:
+        tuple | None: (day, start, end, tutor, room), None if the row has
+            no valid day or times
+    """
+    try:
+        day = WEEKDAYS[row["Tag"]]
+        start, end = (
+            60 * int(hours) + int(minutes)
+            for hours, minutes, *_ in (
+                str(row[col]).split(":") for col in ("Startzeit", "Endzeit")
+            )
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
+    room = f"{row.get('Ort')} {row['Raum']}" if row.get("Raum") else None
+    tutor = (row.get("Tutor:in") or "").strip() or None
+    return day, start, end, tutor, room
+
+
+def timetable_conflicts(
+    version: str, edits: dict | None = None, before: str | None = None
+) -> list[dict]:
+    """Update the conflict index and highlight the double bookings.
+
+    If the index is at the version before the edits only the edited rows
+    are updated, if it is at another version it is rebuilt from the store.
+
+    Args:
+        version (str): current version of the timetable
+        edits (dict | None, optional): "changed" rows and ids of "deleted"
+            rows. Defaults to None.
+        before (str | None, optional): version before the edits.
+            Defaults to None.
+
+    Returns:
+        list[dict]: style_data_conditional of the timetable
+    """
+    with conflicts_lock:
+        if edits is not None and conflicts.version == before:
+            for row_id in edits["deleted"]:
+                conflicts.remove(row_id)
+            rows = edits["changed"]
+        elif conflicts.version != version:
+            conflicts.clear()
+            df, version = store.load("timetable")
+            rows = to_records(df)
+        else:
+            rows = []
+        for row in rows:
+            booking = row_booking(row)
+            if booking is None:
+                conflicts.remove(row[ROW_ID])
+            else:
+                conflicts.update(row[ROW_ID], *booking)
+        conflicts.version = version
+        return [
+            {
+                "if": {"row_id": row_id, "column_id": column},
+                "backgroundColor": CONFLICT_COLOR,
+            }
+            for kind, column in CONFLICT_COLUMNS.items()
+            for row_id in sorted(conflicts.conflicting(kind))
+        ]
 
 
 @callback(
     Output("timetable", "data"),
     Output("timetable", "columns", allow_duplicate=True),
+    Output("timetable-version", "data"),
+    Output("timetable", "style_data_conditional"),
     Input("editing-rows-button", "n_clicks"),
     Input("10_min", "n_intervals"),
-    State("timetable", "data"),
-    State("timetable", "columns"),
+    State("timetable-version", "data"),
     prevent_initial_call="initial_duplicate",
 )
-def add_row_tt(n_clicks, _, rows, columns):
-    if ctx.triggered_id == "editing-rows-button":
-        if n_clicks > 0:
-            rows.append({c["id"]: "" for c in columns})
-        return rows, columns
-    return read_data("timetable.csv")
+def add_row_tt(n_clicks, _, version):
+    edits, before = None, None
+    if ctx.triggered_id == "editing-rows-button" and n_clicks > 0:
+        before = store.version("timetable")
+        store.append_row("timetable")
+        # the new row is empty and has no bookings
+        edits = {"changed": [], "deleted": []}
+    data, columns, current = read_data("timetable", version)
+    if current is no_update:
+        return data, columns, current, no_update
+    return data, columns, current, timetable_conflicts(current, edits, before)
 
 
 @callback(
     Output("font_sizes", "data"),
     Output("font_sizes", "columns"),
+    Output("font_sizes-version", "data"),
     Input("editing-rows-button-fs", "n_clicks"),
     Input("10_min", "n_intervals"),
+    State("font_sizes-version", "data"),
+)
+def add_row_fs(n_clicks, _, version):
+    if ctx.triggered_id == "editing-rows-button-fs" and n_clicks > 0:
+        store.append_row("font_size")
+    return read_data("font_size", version)
+
+
+# the browser sends only the rows that changed since the last edit
+clientside_callback(
+    ClientsideFunction(namespace="tables", function_name="diff_rows"),
+    Output("timetable-edits", "data"),
+    Input("timetable", "data_timestamp"),
+    State("timetable", "data"),
+    State("timetable", "data_previous"),
+    prevent_initial_call=True,
+)
+clientside_callback(
+    ClientsideFunction(namespace="tables", function_name="diff_rows"),
+    Output("font_sizes-edits", "data"),
+    Input("font_sizes", "data_timestamp"),
     State("font_sizes", "data"),
-    State("font_sizes", "columns"),
+    State("font_sizes", "data_previous"),
+    prevent_initial_call=True,
 )
-def add_row_fs(n_clicks, _, rows, columns):
-    if ctx.triggered_id == "editing-rows-button-fs":
-        if n_clicks > 0:
-            rows.append({c["id"]: "" for c in columns})
-        return rows, columns
-    return read_data("font_size.csv")
 
 
 @callback(
-    Output("timetable", "dropdown"),
+    Output("timetable", "data", allow_duplicate=True),
+    Output("timetable-version", "data", allow_duplicate=True),
+    Output("timetable", "style_data_conditional", allow_duplicate=True),
+    Input("timetable-edits", "data"),
+    State("timetable-version", "data"),
+    prevent_initial_call=True,
+)
+def save_edits_tt(edits, version):
+    before = store.version("timetable")
+    data, after = save_edits("timetable", edits, version)
+    styles = timetable_conflicts(store.version("timetable"), edits, before)
+    return data, after, styles
+
+
+@callback(
+    Output("font_sizes", "data", allow_duplicate=True),
+    Output("font_sizes-version", "data", allow_duplicate=True),
+    Input("font_sizes-edits", "data"),
+    State("font_sizes-version", "data"),
+    prevent_initial_call=True,
+)
+def save_edits_fs(edits, version):
+    return save_edits("font_size", edits, version)
+
+
+clientside_callback(
+    ClientsideFunction(namespace="ui", function_name="dropdown_columns"),
     Output("timetable", "columns", allow_duplicate=True),
-    Input("timetable", "data"),
+    Input("timetable-version", "data"),
     State("timetable", "columns"),
-    prevent_initial_call="initial_duplicate",
+    State("timetable", "dropdown"),
+    prevent_initial_call=True,
 )
-def add_table_dropdowns(data, columns):
-    _ = data
-    if columns is not None:
-        dd_dict = {
-            "Tag": {
-                "options": [
-                    {"label": "Montag", "value": "Montag"},
-                    {"label": "Dienstag", "value": "Dienstag"},
-                    {"label": "Mittwoch", "value": "Mittwoch"},
-                    {"label": "Donnerstag", "value": "Donnerstag"},
-                    {"label": "Freitag", "value": "Freitag"},
-                    {"label": "Samstag", "value": "Samstag"},
-                    {"label": "Sonntag", "value": "Sonntag"},
-                ]
-            }
-        }
-        columns = [
-            {"id": col["id"], "name": col["id"], "presentation": "dropdown"}
-            if col["id"] in dd_dict
-            else {"id": col["id"], "name": col["id"]}
-            for col in columns
-        ]
-        return dd_dict, columns
-    return {}, []
-
-
-def convert_to_offset(w_str: str) -> int:
-    wd_dict = {
-        "Montag": 0,
-        "Dienstag": 1,
-        "Mittwoch": 2,
-        "Donnerstag": 3,
-        "Freitag": 4,
-        "Samstag": 5,
-        "Sonntag": 6,
-    }
-    res = wd_dict.get(w_str)
-    assert res is not None
-    return res
 
 
-@callback(Output("day_width", "children"), Input("end_day_dd", "value"))
-def create_day_width_fields(end_day_val) -> list:
-    if end_day_val:
-        return [
-            dbc.Col(dcc.Input(value=1, type="number", min=1, step=1))
-            for i in range(end_day_val)
-        ]
-    return []
+DEFAULT_FONT_SIZE = 10
+TIMETABLE_COLUMNS = [
+    "Tag",
+    "Startzeit",
+    "Endzeit",
+    "Tutor:in",
+    "Schwerpunkt",
+    "Ort",
+    "Raum",
+    "color",
+]
+DEFAULT_COLORS = {
+    "Rüsselsheim": "#E2EFDA",
+    "WBS": "#DDEBF7",
+    "Online": "#FFF2CC",
+}
+# time grid of the y axis, the resolution is chosen in the page
+PLOT_SLOTS = SlotIndex(day_start=0, day_end=24 * 60, resolution=60)
+
+
+def minutes_to_str(minutes: np.ndarray) -> np.ndarray:
+    """Format minutes since midnight as "H:MM".
+
+    Args:
+        minutes (np.ndarray): minutes since midnight
+
+    Returns:
+        np.ndarray: formatted times
+    """
+    return np.char.add(
+        np.char.add((minutes // 60).astype(str), ":"),
+        np.char.zfill((minutes % 60).astype(str), 2),
+    )
+
+
+def bar_geometry(
+    frame: ScheduleFrame, day_offset: np.ndarray, idx: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Get the x position of the bars of laid out events.
+
+    Args:
+        frame (ScheduleFrame): events with assigned lanes
+        day_offset (np.ndarray): x position of the start of every weekday
+        idx (np.ndarray): indices of the events
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: (plot_day, bar_offset,
+            bar_width) of the events
+    """
+    day = frame.day[idx]
+    plot_day = day_offset[day]
+    day_width = day_offset[day + 1] - plot_day
+    bar_width = day_width / frame.day_lanes()[day]
+    return plot_day, bar_width * frame.lane[idx], bar_width
+
+
+clientside_callback(
+    ClientsideFunction(namespace="ui", function_name="day_width_fields"),
+    Output("day_width", "children"),
+    Input("end_day_dd", "value"),
+)
+
 
+def load_tables() -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Load the timetable and the font size table sorted by duration.
 
-def add_annotations(
-    row: pd.Series,
-    fig: go.Figure,
-    font: str,
-    px_font_size: int,
-    max_width: int,
-    day_width: np.ndarray,
+    Rendering only reads the tables, the timetable keeps the order of the
+    store and the plan sorts its events by time itself.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: (timetable, font sizes)
+    """
+    tt_df, _ = store.load("timetable")
+    tt_df = tt_df[[ROW_ID, *TIMETABLE_COLUMNS]]
+    fs_df, _ = store.load("font_size")
+    fs_df = fs_df.astype(int).sort_values("Dauer").reset_index(drop=True)
+    return tt_df, fs_df
+
+
+@lru_cache(maxsize=16)
+def compile_font_sizes(
+    fs_table: tuple[tuple[int, int], ...]
+) -> tuple[np.ndarray, np.ndarray]:
+    """Compile the font size table into sorted duration breakpoints.
+
+    Args:
+        fs_table (tuple[tuple[int, int], ...]): (Dauer, Schriftgröße) rows
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (breakpoints, font sizes)
+    """
+    table = np.array(sorted(fs_table), dtype=float).reshape(-1, 2)
+    return table[:, 0], table[:, 1].astype(int)
+
+
+def lookup_font_sizes(
+    durations: np.ndarray, fs_table: tuple[tuple[int, int], ...]
+) -> np.ndarray:
+    """Get the font size of every event from its duration in hours.
+
+    Every event gets the size of the longest Dauer that is not longer than
+    the event. Events shorter than every Dauer get the smallest bucket,
+    without any table the size falls back to DEFAULT_FONT_SIZE.
+
+    Args:
+        durations (np.ndarray): durations in hours
+        fs_table (tuple[tuple[int, int], ...]): (Dauer, Schriftgröße) rows
+
+    Returns:
+        np.ndarray: font size of every event
+    """
+    breakpoints, sizes = compile_font_sizes(fs_table)
+    if sizes.size == 0:
+        return np.full(len(durations), DEFAULT_FONT_SIZE)
+    ind = np.searchsorted(breakpoints, durations, side="right") - 1
+    return sizes[np.clip(ind, 0, None)]
+
+
+LABEL_POSITIONS = ("bottom right", "bottom left", "top left", "top right")
+LABEL_FONT = "arial"
+MIN_FONT_SIZE = 6
+# default left and right margin of a plotly figure in pixels
+PLOT_MARGINS = 160
+
+
+def plot_scale(width: int | None, day_offset: np.ndarray) -> float:
+    """Get the pixels per x unit of the plot area.
+
+    Args:
+        width (int | None): width of the figure in pixels
+        day_offset (np.ndarray): x position of the start of every weekday
+
+    Returns:
+        float: pixels per x unit, inf without a width
+    """
+    if not width:
+        return np.inf
+    return (width - PLOT_MARGINS) / (day_offset[-1] + 0.1)
+
+
+def label_widths(texts: np.ndarray, font_sizes: np.ndarray) -> np.ndarray:
+    """Get the width of labels in pixels, the width of their widest line.
+
+    Every distinct label is measured once at a cell height of 100 pixels,
+    its width grows linearly with the font size.
+
+    Args:
+        texts (np.ndarray): labels, lines separated by "<br>"
+        font_sizes (np.ndarray): font size of every label in points
+
+    Returns:
+        np.ndarray: widths
+    """
+    labels, inverse = np.unique(texts.astype(str), return_inverse=True)
+    widths = np.array(
+        [
+            max(
+                get_text_dims(line, 100, LABEL_FONT)[0]
+                for line in label.split("<br>")
+            )
+            for label in labels
+        ],
+        dtype=float,
+    )
+    return widths[inverse] * font_sizes * (96 / 72) / 100
+
+
+def fit_font_sizes(
+    font_sizes: np.ndarray, text: np.ndarray, bar_px: np.ndarray
+) -> np.ndarray:
+    """Shrink the font of events whose labels are wider than their bar.
+
+    The first two labels share the top edge of a bar, the last two its
+    bottom edge. Fonts never get smaller than MIN_FONT_SIZE.
+
+    Args:
+        font_sizes (np.ndarray): font size of every event
+        text (np.ndarray): labels with one row per entry of LABEL_POSITIONS
+        bar_px (np.ndarray): width of every bar in pixels
+
+    Returns:
+        np.ndarray: fitted font sizes
+    """
+    widths = [label_widths(labels, font_sizes) for labels in text]
+    needed = np.maximum(widths[0] + widths[1], widths[2] + widths[3])
+    fitted = np.floor(font_sizes * bar_px / np.maximum(needed, 1))
+    return np.clip(fitted, MIN_FONT_SIZE, font_sizes).astype(int)
+
+
+def event_values(
+    frame: ScheduleFrame,
+    idx: np.ndarray,
+    day_offset: np.ndarray,
+    fs_table: tuple[tuple[int, int], ...],
+    px_per_unit: float = np.inf,
+) -> dict[str, np.ndarray]:
+    """Get the values the figure shows for some laid out events.
+
+    Args:
+        frame (ScheduleFrame): laid out events
+        idx (np.ndarray): indices of the events
+        day_offset (np.ndarray): x position of the start of every weekday
+        fs_table (tuple[tuple[int, int], ...]): (Dauer, Schriftgröße) rows
+        px_per_unit (float, optional): pixels per x unit, labels are fit
+            into the width of their bar. Defaults to inf, no fitting.
+
+    Returns:
+        dict[str, np.ndarray]: bar values with one entry per event and
+            label values ("label_x", "label_y", "text") with one row per
+            entry of LABEL_POSITIONS
+    """
+    plot_day, bar_offset, bar_width = bar_geometry(frame, day_offset, idx)
+    start = 60 * frame.start[idx]
+    end = 60 * frame.end[idx]
+    left = plot_day + bar_offset
+    right = left + bar_width
+    times = np.char.add(
+        np.char.add(minutes_to_str(frame.start[idx]), "-"),
+        minutes_to_str(frame.end[idx]),
+    )
+    names = np.char.add(
+        np.char.add(frame.tutor.decode(idx).astype(str), "<br>"),
+        frame.subject.decode(idx).astype(str),
+    )
+    text = np.stack(
+        [names, times, frame.room.decode(idx), frame.location.decode(idx)]
+    )
+    font_size = lookup_font_sizes(
+        (frame.end[idx] - frame.start[idx]) / 60, fs_table
+    )
+    if np.isfinite(px_per_unit):
+        font_size = fit_font_sizes(font_size, text, bar_width * px_per_unit)
+    return {
+        "x": plot_day,
+        "y": end - start,
+        "base": start,
+        "width": bar_width,
+        "offset": bar_offset,
+        "color": frame.color.decode(idx),
+        "font_size": font_size,
+        "label_x": np.stack([left, right, right, left]),
+        "label_y": np.stack([start, start, end, end]),
+        "text": text,
+    }
+
+
+def add_location_traces(
+    fig: go.Figure, values: dict[str, np.ndarray], ort: str, font: str
 ) -> None:
-    width = day_width / (max_width)
-    offset = width * (row["offset"])
-    startzeit = row["Startzeit"]
-    endzeit = row["Endzeit"]
-    time = row["Startzeitpunkt"].time()
-    for i, text in enumerate([row["Tutor:in"], row["Schwerpunkt"]]):
-        text_dims = get_text_dims(
-            str(text), int(px_font_size * (96 / 72)), font
+    """Add the bars and labels of all events at one location to the figure.
+
+    All bars go into a single array valued go.Bar, all labels into a single
+    text go.Scatter, both sharing the legend group of the location.
+
+    Args:
+        fig (go.Figure): figure to add the traces to
+        values (dict[str, np.ndarray]): event_values() of the events at the
+            location
+        ort (str): location
+        font (str): font family of the labels
+    """
+    n_events = len(values["x"])
+    fig.add_trace(
+        go.Bar(
+            x=values["x"],
+            y=values["y"],
+            base=values["base"],
+            marker_color=values["color"],
+            name=ort,
+            width=values["width"],
+            offset=values["offset"],
+            legendgroup=ort,
         )
-        fig.add_annotation(
-            x=float(row["plot_day"] + offset),
-            y=float(
-                time.second
-                + 60 * time.minute
-                + 60**2 * time.hour
-                # + row["diff"]
-            ),
-            text=str(text),
-            ax=0,
-            ay=0,
-            showarrow=False,
-            align="left",
-            valign="bottom",
-            font=dict(
+    )
+    fig.add_trace(
+        go.Scatter(
+            x=values["label_x"].ravel(),
+            y=values["label_y"].ravel(),
+            text=values["text"].ravel(),
+            textposition=np.repeat(LABEL_POSITIONS, n_events),
+            textfont=dict(
                 family=font,
-                size=px_font_size,
+                size=np.tile(values["font_size"], len(LABEL_POSITIONS)),
             ),
-            xanchor="left",
-            yanchor="middle",
-            xshift=0,  # -text_dims[0]/2,
-            yshift=-text_dims[1] * (2 * i + 1) / 2,
+            mode="text",
+            name=ort,
+            legendgroup=ort,
+            showlegend=False,
+            hoverinfo="skip",
+        )
+    )
+
+
+@dataclass
+class RenderState:
+    """What the figure of the last render shows.
+
+    Events are kept in the order of the frame. The bars of the locations
+    are the traces 2 * trace, their labels the traces 2 * trace + 1.
+    """
+
+    settings: str
+    data: list
+    frame: ScheduleFrame
+    day_offset: np.ndarray
+    fs_table: tuple[tuple[int, int], ...]
+    row_pos: dict  # frame index of every timetable row by its ROW_ID
+    trace: np.ndarray  # location trace of every event
+    trace_pos: np.ndarray  # index of every event in its trace
+    trace_len: np.ndarray  # number of events of every location trace
+    sel_week: str
+    end_day_val: int
+    width: int
+    height: int
+    slots: SlotIndex = PLOT_SLOTS  # time grid of the y axis
+
+
+def location_traces(
+    frame: ScheduleFrame,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Assign every event to the trace of its location.
+
+    Locations get traces in the order they first appear.
+
+    Args:
+        frame (ScheduleFrame): events
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: (trace, trace_pos,
+            trace_len) as in RenderState
+    """
+    trace = np.empty(len(frame), dtype=np.intp)
+    trace_pos = np.empty(len(frame), dtype=np.intp)
+    trace_len = []
+    for code in pd.unique(frame.location.codes):
+        idx = np.flatnonzero(frame.location.codes == code)
+        trace[idx] = len(trace_len)
+        trace_pos[idx] = np.arange(len(idx))
+        trace_len.append(len(idx))
+    return trace, trace_pos, np.array(trace_len, dtype=np.intp)
+
+
+LOGO_PATH = Path(__file__).resolve().parents[1] / "img" / "logo.png"
+
+
+@lru_cache(maxsize=1)
+def logo_source() -> str:
+    """Get the logo as a data URI, so plans render without network access.
+
+    Returns:
+        str: data URI of the png
+    """
+    logo = base64.b64encode(LOGO_PATH.read_bytes()).decode()
+    return f"data:image/png;base64,{logo}"
+
+
+MAX_PATCH_SHARE = 0.25
+render_states = diskcache.Cache(
+    CACHE_DIR / "render_states",
+    size_limit=2**28,
+    eviction_policy="least-recently-used",
+)
+
+
+def remember_render(key: str, state: RenderState) -> None:
+    """Keep the render state of the figure with the given key.
+
+    Args:
+        key (str): hash of the figure inputs
+        state (RenderState): render state
+    """
+    render_states.set(key, state)
+
+
+def patch_event(patch: Patch, state: RenderState, i: int, values: dict) -> None:
+    """Assign the bar and label entries of one event.
+
+    Args:
+        patch (Patch): figure patch
+        state (RenderState): render state of the patched figure
+        i (int): frame index of the event
+        values (dict): event_values() of the event
+    """
+    trace = int(state.trace[i])
+    j = int(state.trace_pos[i])
+    n_events = int(state.trace_len[trace])
+    bar = patch["data"][2 * trace]
+    for key in ("x", "y", "base", "width", "offset"):
+        bar[key][j] = values[key].tolist()
+    bar["marker"]["color"][j] = str(values["color"])
+    labels = patch["data"][2 * trace + 1]
+    for k in range(len(LABEL_POSITIONS)):
+        pos = k * n_events + j
+        labels["x"][pos] = values["label_x"][k].tolist()
+        labels["y"][pos] = values["label_y"][k].tolist()
+        labels["text"][pos] = str(values["text"][k])
+        labels["textfont"]["size"][pos] = values["font_size"].tolist()
+
+
+def patch_chart(
+    state: RenderState, data: list, settings: str
+) -> tuple[Patch, RenderState] | None:
+    """Update only the bars and labels of the events that changed.
+
+    The lanes of the weekdays of the changed rows, before and after the
+    change, are recomputed. Only events whose bar or labels moved are sent.
+
+    Args:
+        state (RenderState): render state of the figure the client has
+        data (list): timetable rows
+        settings (str): hash of all other figure inputs
+
+    Returns:
+        tuple[Patch, RenderState] | None: (patch, state after the patch),
+            None if the figure has to be rebuilt because the settings
+            changed, rows were added or removed, an Ort changed or too many
+            rows changed
+    """
+    if settings != state.settings or len(data) != len(state.data):
+        return None
+    # rows are matched by id, their position in the table does not matter
+    old_rows = {row[ROW_ID]: row for row in state.data}
+    changed = [row for row in data if old_rows.get(row[ROW_ID]) != row]
+    if any(row[ROW_ID] not in old_rows for row in changed):
+        return None
+    if len(changed) > MAX_PATCH_SHARE * len(data):
+        return None
+    if not changed:
+        return Patch(), replace(state, data=data)
+    pos = np.array([state.row_pos[row[ROW_ID]] for row in changed])
+    rows = ScheduleFrame.from_timetable(pd.DataFrame(changed), DEFAULT_COLORS)
+    if (rows.location.decode() != state.frame.location.decode(pos)).any():
+        return None
+    frame = state.frame.assign(pos, rows)
+    affected = frame.layout(np.union1d(state.frame.day[pos], rows.day))
+    scale = plot_scale(state.width, state.day_offset)
+    old = event_values(
+        state.frame, affected, state.day_offset, state.fs_table, scale
+    )
+    new = event_values(frame, affected, state.day_offset, state.fs_table, scale)
+    moved = np.zeros(len(affected), dtype=bool)
+    for key, values in new.items():
+        moved |= (old[key] != values).reshape(-1, len(affected)).any(axis=0)
+    patch = Patch()
+    for k in np.flatnonzero(moved):
+        patch_event(
+            patch,
+            state,
+            affected[k],
+            {key: values[..., k] for key, values in new.items()},
         )
-    room_txt = row["Raum"] or ""
-    text_dims = get_text_dims(room_txt, int(px_font_size * (96 / 72)), font)
-    fig.add_annotation(
-        x=float(row["plot_day"] + offset + width),
-        y=float(
-            time.second + 60 * time.minute + 60**2 * time.hour + row["diff"]
-        ),
-        text=room_txt,
-        ax=0,
-        ay=0,
-        showarrow=False,
-        align="left",
-        valign="bottom",
-        font=dict(
-            family=font,
-            size=px_font_size,
-        ),
-        xanchor="right",
-        yanchor="middle",
-        xshift=0,  # -text_dims[0]/2,
-        yshift=text_dims[1] / 2,
+    return patch, replace(state, data=data, frame=frame)
+
+
+clientside_callback(
+    ClientsideFunction(namespace="ui", function_name="toggle_collapse"),
+    Output("collapse-fs", "is_open"),
+    Input("collapse-button-fs", "n_clicks"),
+    State("collapse-fs", "is_open"),
+)
+
+
+def add_annotations(fig: go.Figure, state: RenderState) -> None:
+    """Add the logo and the title to the plan.
+
+    Args:
+        fig (go.Figure): plan
+        state (RenderState): render state of the plan
+    """
+    fig.add_layout_image(
+        source=logo_source(),
+        xref="paper",
+        yref="paper",
+        x=0.8,
+        y=1,
+        sizex=0.6,
+        sizey=0.5,
+        xanchor="left",
+        yanchor="bottom",
+        sizing="contain"
     )
-    text_dims = get_text_dims(
-        f"{startzeit}-{endzeit}", int(px_font_size * (96 / 72)), font
+    fig.update_layout(
+        margin={"autoexpand":True,
+                "t":state.height*0.3},
+        title={
+            "text": f"Helpdeskplan für KW {state.sel_week}",
+            "x": 0.5,
+            "xanchor": "center",
+            "yanchor": "top",
+        },
     )
-    fig.add_annotation(
-        x=float(row["plot_day"] + offset + width),
-        y=float(time.second + 60 * time.minute + 60**2 * time.hour),
-        text=f"{startzeit}-{endzeit}",
-        ax=0,
-        ay=0,
-        showarrow=False,
-        align="left",
-        valign="bottom",
-        font=dict(
-            family=font,
-            size=px_font_size,
-        ),
-        xanchor="right",
-        yanchor="middle",
-        xshift=0,  # -text_dims[0]/2,
-        yshift=-text_dims[1] / 2,
+
+
+def build_figure(
+    state: RenderState,
+    set_progress=lambda progress: None,
+    timer: StageTimer | None = None,
+) -> go.Figure:
+    """Build the plan figure of a render state.
+
+    Args:
+        state (RenderState): laid out events and figure settings
+        set_progress (optional): callback getting (percent, stage) before
+            the traces and the annotations are built. Defaults to none.
+        timer (StageTimer | None, optional): timer for the stages traces
+            and annotations. Defaults to None.
+
+    Returns:
+        go.Figure: plan
+    """
+    day_offset = state.day_offset
+    timer = StageTimer() if timer is None else timer
+    layout = go.Layout(
+        paper_bgcolor="#fff",
+        plot_bgcolor="#fff",
+        #autosize=False,
+        width=state.width,
+        height=state.height,
     )
-    text_dims = get_text_dims(
-        str(row["Ort"]), int(px_font_size * (96 / 72)), font
+    fig = go.Figure(layout=layout)
+    x_tick_labels = [
+        "Montag",
+        "Dienstag",
+        "Mittwoch",
+        "Donnerstag",
+        "Freitag",
+        "Samstag",
+        "Sonntag",
+    ]
+
+    x_tick_vals = [
+        day_offset[i] + (day_offset[i + 1] - day_offset[i]) / 2
+        for i in range(len(day_offset) - 1)
+    ]
+    # hours are labeled, finer slots only get grid lines
+    y_tick_vals, y_tick_labels = state.slots.ticks(60)
+    fig.update_yaxes(
+        autorange="reversed",
+        mirror="ticks",
+        gridcolor="black",
+        tickmode="array",
+        tickvals=60 * y_tick_vals,
+        ticktext=y_tick_labels,
     )
-    fig.add_annotation(
-        x=float(row["plot_day"] + offset),
-        y=float(
-            time.second + 60 * time.minute + 60**2 * time.hour + row["diff"]
-        ),
-        text=str(row["Ort"]),
-        ax=0,
-        ay=0,
-        showarrow=False,
-        align="left",
-        valign="bottom",
-        font=dict(
-            family=font,
-            size=px_font_size,
-        ),
-        xanchor="left",
-        yanchor="middle",
-        xshift=0,  # -text_dims[0]/2,
-        yshift=text_dims[1] / 2,
+    if state.slots.resolution < 60:
+        fig.update_yaxes(
+            minor=dict(
+                tickmode="array",
+                tickvals=60 * state.slots.bounds,
+                showgrid=True,
+                gridcolor="lightgrey",
+            )
+        )
+
+    fig.update_xaxes(
+        range=[
+            -0.05,
+            day_offset[-1] + 0.05,
+        ],
+        tickmode="array",
+        tickvals=x_tick_vals,
+        ticktext=x_tick_labels[: state.end_day_val],
+        side="top",
+    )  # ,ticklabelmode="period")#, )
+    fig.update_layout(
+        barmode="group",
+        bargap=0.1,
+        bargroupgap=0,
     )
 
+    set_progress((75, "Traces"))
+    with timer.stage("traces", rows=len(state.frame)):
+        scale = plot_scale(state.width, day_offset)
+        for trace in range(len(state.trace_len)):
+            idx = np.flatnonzero(state.trace == trace)
+            add_location_traces(
+                fig,
+                event_values(
+                    state.frame, idx, day_offset, state.fs_table, scale
+                ),
+                state.frame.location[idx[0]],
+                LABEL_FONT,
+            )
 
-@callback(
-    Output("collapse-fs", "is_open"),
-    [Input("collapse-button-fs", "n_clicks")],
-    [State("collapse-fs", "is_open")],
-)
-def toggle_collapse_fs(n, is_open):
-    if n:
-        return not is_open
-    return is_open
+    set_progress((100, "Annotations"))
+    with timer.stage("annotations"):
+        add_annotations(fig, state)
+    return fig
 
 
 @callback(
     Output("tt-graph", "figure"),
+    Output("tt-graph-state", "data"),
     Input("create-plan", "n_clicks"),
-    State("timetable", "data"),
     State("date-picker", "value"),
     State("end_day_dd", "value"),
     State("day_width", "children"),
-    State("font_sizes", "data"),
     State("plan-w", "value"),
     State("plan-h", "value"),
+    State("plan-resolution", "value"),
+    State("tt-graph-state", "data"),
+    background=True,
+    progress=[
+        Output("plan-progress", "value"),
+        Output("plan-progress", "label"),
+    ],
+    running=[
+        (Output("cancel-plan", "disabled"), False, True),
+        (Output("plan-progress", "style"), {}, {"display": "none"}),
+    ],
+    cancel=[Input("cancel-plan", "n_clicks")],
     prevent_initial_call=True,
 )
 def create_chart(
-    _, data, date_str, end_day_val, day_widths, fs_data, width, height
+    set_progress,
+    _,
+    date_str,
+    end_day_val,
+    day_widths,
+    width,
+    height,
+    resolution,
+    state_key,
+):
+    """Render the plan in a background process.
+
+    Clicking "Create Plan" again while a render runs cancels it and starts
+    a new one, "Cancel" only stops it.
+    """
+    timer = StageTimer("chart.")
+    try:
+        return run_profiled(
+            render_chart,
+            set_progress,
+            timer,
+            date_str,
+            end_day_val,
+            day_widths,
+            width,
+            height,
+            resolution,
+            state_key,
+        )
+    finally:
+        publish(timer)
+
+
+def render_chart(
+    set_progress,
+    timer: StageTimer,
+    date_str,
+    end_day_val,
+    day_widths,
+    width,
+    height,
+    resolution,
+    state_key,
 ):
     if (
-        data is not None
-        and date_str is not None
+        date_str is not None
         and end_day_val is not None
         and day_widths is not None
     ):
@@ -278,236 +1020,84 @@ def create_chart(
         ]
         day_offset = np.cumsum(widths)
         day_offset = np.insert(day_offset, 0, 0, axis=0)
-        df = pd.DataFrame(data)
+        set_progress((25, "Parsing"))
+        with timer.stage("load") as obs:
+            tt_df, fs_df = load_tables()
+            data = to_records(tt_df)
+            fs_data = to_records(fs_df)
+            obs.rows = len(data)
         sel_week = dt.datetime.fromisoformat(date_str).strftime("%V %G")
-        date = dt.datetime.strptime(f"1 {sel_week}", "%w %V %G").date()
-        df["Startzeitpunkt"] = df.apply(
-            lambda x: dt.datetime.combine(
-                date,
-                dt.datetime.strptime(x["Startzeit"], "%H:%M").time(),
-            ),
-            axis=1,
+        settings = hash_inputs(
+            fs_data, sel_week, end_day_val, widths, width, height, resolution
         )
-        df["Endzeitpunkt"] = df.apply(
-            lambda x: dt.datetime.combine(
-                date,
-                dt.datetime.strptime(x["Endzeit"], "%H:%M").time(),
-            ),
-            axis=1,
-        )
-        df["diff"] = (
-            df["Endzeitpunkt"] - df["Startzeitpunkt"]
-        ).dt.total_seconds()
-        df["week_day"] = df["Tag"].apply(convert_to_offset)
-        df["plot_day"] = df.apply(
-            lambda x: day_offset[x.week_day],
-            axis=1,
-        )
-        df["color"] = df["color"].fillna(
-            df["Ort"].map(
-                {
-                    "Rüsselsheim": "#E2EFDA",
-                    "WBS": "#DDEBF7",
-                    "Online": "#FFF2CC",
-                }
+        key = hash_inputs(data, settings)
+        if state_key == key:
+            return no_update, no_update
+        state = render_states.get(state_key) if state_key else None
+        if state is not None:
+            with timer.stage("patch", rows=len(data)):
+                result = patch_chart(state, data, settings)
+            if result is not None:
+                patch, state = result
+                remember_render(key, state)
+                return patch, key
+        fig_json = figure_cache.get(key)
+        if fig_json is not None:
+            return json.loads(fig_json), key
+        with timer.stage("parse", rows=len(data)):
+            frame = ScheduleFrame.from_timetable(
+                pd.DataFrame(data), DEFAULT_COLORS
+            )
+            order = np.lexsort((frame.end, frame.start))
+            frame = frame.take(order)
+        set_progress((50, "Layout"))
+        with timer.stage("layout", rows=len(frame)):
+            frame.layout()
+        row_pos = {data[r][ROW_ID]: i for i, r in enumerate(order)}
+        fs_table = tuple(
+            fs_df[["Dauer", "Schriftgröße"]].itertuples(
+                index=False, name=None
             )
         )
-        df["offset"] = pd.Series([pd.NA] * df.shape[0])
-        df = df.sort_values(["Startzeitpunkt", "Endzeitpunkt"]).reset_index(
-            drop=True
-        )
-        df[
-            [
-                "Tag",
-                "Startzeit",
-                "Endzeit",
-                "Tutor:in",
-                "Schwerpunkt",
-                "Ort",
-                "Raum",
-                "color",
-            ]
-        ].to_csv("./timetable.csv", index=False)
-        fs_df = (
-            pd.DataFrame(fs_data)
-            .astype(int)
-            .sort_values("Dauer")
-            .reset_index(drop=True)
-        )
-        fs_df.to_csv("./font_size.csv", index=False)
-        layout = go.Layout(
-            paper_bgcolor="#fff",
-            plot_bgcolor="#fff",
-            #autosize=False,
+        trace, trace_pos, trace_len = location_traces(frame)
+        state = RenderState(
+            settings=settings,
+            data=data,
+            frame=frame,
+            day_offset=day_offset,
+            fs_table=fs_table,
+            row_pos=row_pos,
+            trace=trace,
+            trace_pos=trace_pos,
+            trace_len=trace_len,
+            sel_week=sel_week,
+            end_day_val=end_day_val,
             width=width,
             height=height,
+            slots=replace(
+                PLOT_SLOTS, resolution=resolution or PLOT_SLOTS.resolution
+            ),
         )
-        fig = go.Figure(layout=layout)
-        sd_df = {
-            tag: df.loc[df.Tag == tag, :].reset_index(names=["old_ind"])
-            for tag in df.Tag.unique()
-        }
-        show_legend = {"Rüsselsheim": True, "WBS": True, "Online": True}
-
-        x_tick_labels = [
-            "Montag",
-            "Dienstag",
-            "Mittwoch",
-            "Donnerstag",
-            "Freitag",
-            "Samstag",
-            "Sonntag",
-        ]
-
-        x_tick_vals = [
-            day_offset[i] + (day_offset[i + 1] - day_offset[i]) / 2
-            for i in range(len(day_offset) - 1)
-        ]
-        y_tick_vals = np.arange(0, 3600 * 24, 3600)
-        y_tick_labels = [
-            datetime.time(tick // 3600).strftime("%H:%M")
-            for tick in y_tick_vals
-        ]
-        fig.update_yaxes(
-            autorange="reversed",
-            mirror="ticks",
-            gridcolor="black",
-            tickmode="array",
-            tickvals=y_tick_vals,
-            ticktext=y_tick_labels,
-        )
+        fig = build_figure(state, set_progress, timer)
+        with timer.stage("serialize"):
+            figure_cache.put(key, fig.to_json())
+        remember_render(key, state)
+        return fig, key
+    # no week, last day or day widths chosen yet
+    return no_update, no_update
 
-        fig.update_xaxes(
-            range=[
-                -0.05,
-                day_offset[-1] + 0.05,
-            ],
-            tickmode="array",
-            tickvals=x_tick_vals,
-            ticktext=x_tick_labels[:end_day_val],
-            side="top",
-        )  # ,ticklabelmode="period")#, )
-        fig.update_layout(
-            barmode="group",
-            bargap=0.1,
-            bargroupgap=0,
-        )
 
-        print(f"{df=}")
-
-        for _, wd_df in sd_df.items():
-            for _, row in wd_df.iterrows():
-                overlap_df = wd_df.loc[
-                    (
-                        (wd_df.Startzeitpunkt <= row.Startzeitpunkt)
-                        & (row.Startzeitpunkt < wd_df.Endzeitpunkt)
-                    )
-                    | (
-                        (row.Startzeitpunkt <= wd_df.Startzeitpunkt)
-                        & (wd_df.Startzeitpunkt < row.Endzeitpunkt)
-                    )
-                    | (
-                        (row.Endzeitpunkt >= wd_df.Endzeitpunkt)
-                        & (wd_df.Endzeitpunkt > row.Startzeitpunkt)
-                    )
-                    | (
-                        (wd_df.Endzeitpunkt >= row.Endzeitpunkt)
-                        & (row.Endzeitpunkt > wd_df.Startzeitpunkt)
-                    )
-                ].reset_index(drop=True)
-                used_offsets = (
-                    df.loc[overlap_df["old_ind"], "offset"]
-                    .to_frame()
-                    .reset_index(drop=True)
-                    .loc[~overlap_df["offset"].isna()]
-                    .values
-                )
-                if np.size(used_offsets) == 0:
-                    cur_offset = 0
-                else:
-                    cur_offset = find_lowest_missing(used_offsets)
-                tutor = row["Tutor:in"]
-                ind = (
-                    df.query(
-                        f"`Tutor:in` == '{tutor}' "
-                        f" and Ort == '{row.Ort}'"
-                        f" and Schwerpunkt == '{row.Schwerpunkt}'"
-                    )
-                    .loc[
-                        (df.Startzeitpunkt == row.Startzeitpunkt)
-                        & (df.Endzeitpunkt == row.Endzeitpunkt)
-                    ]
-                    .index.values[0]
-                )
-                df.loc[ind, "offset"] = cur_offset
-                wd_df.loc[wd_df.old_ind == ind, "offset"] = cur_offset
-            max_width = wd_df["offset"].max() + 1
-            for k, row in wd_df.iterrows():
-                day_width = (
-                    day_offset[row.week_day + 1] - day_offset[row.week_day]
-                )
-                width = day_width / (max_width)
-                offset = width * (row["offset"])
-                time = row["Startzeitpunkt"].time()
-                trace = go.Bar(
-                    x=[row["plot_day"]],
-                    y=[row["diff"]],
-                    base=[time.second + 60 * time.minute + 60**2 * time.hour],
-                    marker_color=row["color"],
-                    name=row["Ort"],
-                    width=width,
-                    offset=offset,
-                    legendgroup=row["Ort"],
-                    showlegend=show_legend[row["Ort"]],
-                )
-                if show_legend[row["Ort"]]:
-                    show_legend[row["Ort"]] = False
-                fig.add_trace(trace)
-                font = "arial"
-                fs_df["next_size"] = fs_df["Dauer"].shift(-1)
-                duration = np.divide(row["diff"], 3600)
-                px_font_size = int(
-                    fs_df.loc[
-                        (fs_df["Dauer"] <= duration)
-                        & (
-                            (fs_df["next_size"] > duration)
-                            ^ (pd.isna(fs_df["next_size"]))
-                        ),
-                        "Schriftgröße",
-                    ].values[0]
-                )
-                add_annotations(
-                    row, fig, font, px_font_size, max_width, day_width
-                )
-
-        print(height)
-        fig.add_layout_image(
-            source="https://upload.wikimedia.org/wikipedia/commons/thumb/5/53/Logo-Hochschule-RheinMain.svg/2560px-Logo-Hochschule-RheinMain.svg.png",
-            xref="paper",
-            yref="paper",
-            x=0.8,
-            y=1,
-            sizex=0.6,
-            sizey=0.5,
-            xanchor="left",
-            yanchor="bottom",
-            sizing="contain"
-        )
-        fig.update_layout(
-            margin={"autoexpand":True,
-                    "t":height*0.3},
-            title={
-                "text": f"Helpdeskplan für KW {sel_week}",
-                "x": 0.5,
-                "xanchor": "center",
-                "yanchor": "top",
-            },
-        )
-        return fig
+clientside_callback(
+    ClientsideFunction(namespace="ui", function_name="export_links"),
+    Output("export-png", "href"),
+    Output("export-svg", "href"),
+    Output("export-pdf", "href"),
+    Input("tt-graph-state", "data"),
+)
 
 
-@callback(Output("cw-output", "children"), Input("date-picker", "value"))
-def date_to_cw(date_str: str) -> str:
-    date = pd.to_datetime(date_str, yearfirst=True, format="%Y-%m-%d")
-    cw_str = date.strftime("%V %G")
-    return cw_str
+clientside_callback(
+    ClientsideFunction(namespace="ui", function_name="date_to_cw"),
+    Output("cw-output", "children"),
+    Input("date-picker", "value"),
+)
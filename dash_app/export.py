@@ -0,0 +1,81 @@
+"""Server side export of plans to png, svg and pdf."""
+import json
+import re
+import threading
+
+import diskcache
+import flask
+import plotly.io as pio
+
+from dash_app.callbacks import (
+    CACHE_DIR,
+    build_figure,
+    figure_cache,
+    render_states,
+)
+
+EXPORT_FORMATS = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "pdf": "application/pdf",
+}
+export_cache = diskcache.Cache(
+    CACHE_DIR / "exports",
+    size_limit=2**28,
+    eviction_policy="least-recently-used",
+)
+# kaleido renders in one shared subprocess
+_render_lock = threading.Lock()
+
+
+def render_plan(key: str, fmt: str) -> bytes | None:
+    """Render a plan, reusing earlier renders of the same figure.
+
+    Args:
+        key (str): hash of the figure inputs, as in tt-graph-state
+        fmt (str): one of EXPORT_FORMATS
+
+    Returns:
+        bytes | None: rendered file, None if the figure is unknown
+    """
+    cache_key = f"{key}.{fmt}"
+    image = export_cache.get(cache_key)
+    if image is not None:
+        return image
+    fig_json = figure_cache.get(key)
+    if fig_json is not None:
+        fig = json.loads(fig_json)
+    else:
+        # patched figures are only kept as render state
+        state = render_states.get(key)
+        if state is None:
+            return None
+        fig = build_figure(state)
+    with _render_lock:
+        image = pio.to_image(fig, format=fmt)
+    export_cache.set(cache_key, image)
+    return image
+
+
+def export_plan(key: str, fmt: str) -> flask.Response:
+    """Serve a plan as a download.
+
+    Args:
+        key (str): hash of the figure inputs
+        fmt (str): one of EXPORT_FORMATS
+
+    Returns:
+        flask.Response: rendered file
+    """
+    if fmt not in EXPORT_FORMATS or not re.fullmatch("[0-9a-f]{64}", key):
+        flask.abort(404)
+    image = render_plan(key, fmt)
+    if image is None:
+        flask.abort(404)
+    return flask.Response(
+        image,
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="Helpdeskplan.{fmt}"'
+        },
+    )
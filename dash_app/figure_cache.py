@@ -0,0 +1,126 @@
+"""Content addressed LRU cache for serialized plotly figures."""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+def hash_inputs(*inputs) -> str:
+    """Get a stable hash of json serializable inputs.
+
+    Returns:
+        str: hex digest of the inputs
+    """
+    payload = json.dumps(
+        inputs, sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class FigureCache:
+    """Size bounded LRU cache of figure json, optionally kept on disk."""
+
+    def __init__(self, maxsize: int = 32, directory: Path | None = None):
+        """Initialize the FigureCache class.
+
+        Args:
+            maxsize (int, optional): number of figures to keep.
+                Defaults to 32.
+            directory (Path | None, optional): directory to persist the
+                figures in. Defaults to None.
+        """
+        self.maxsize = maxsize
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._figures: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        if directory is not None:
+            directory.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str) -> str | None:
+        """Get the figure json stored under key.
+
+        Args:
+            key (str): hash of the figure inputs
+
+        Returns:
+            str | None: figure json, None if it is not cached
+        """
+        with self._lock:
+            fig_json = self._figures.get(key)
+            if fig_json is not None:
+                self._figures.move_to_end(key)
+        if fig_json is None and self.directory is not None:
+            fig_json = self._read(self.directory / f"{key}.json")
+            if fig_json is not None:
+                self._remember(key, fig_json)
+        with self._lock:
+            if fig_json is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return fig_json
+
+    def put(self, key: str, fig_json: str) -> None:
+        """Store figure json under key.
+
+        Args:
+            key (str): hash of the figure inputs
+            fig_json (str): serialized figure
+        """
+        self._remember(key, fig_json)
+        if self.directory is not None:
+            # other processes may write the same key, so every writer gets
+            # its own temporary file
+            fd, tmp_path = tempfile.mkstemp(
+                suffix=".tmp", prefix=f"{key}.", dir=self.directory
+            )
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as file:
+                    file.write(fig_json)
+                os.replace(tmp_path, self.directory / f"{key}.json")
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self._prune()
+
+    def _read(self, path: Path) -> str | None:
+        """Read figure json from disk and mark it as recently used.
+
+        Args:
+            path (Path): figure file
+
+        Returns:
+            str | None: figure json, None if the file is missing or not
+                valid json
+        """
+        try:
+            fig_json = path.read_text(encoding="utf-8")
+            json.loads(fig_json)
+            path.touch()
+        except (OSError, ValueError):
+            return None
+        return fig_json
+
+    def _prune(self) -> None:
+        """Delete the least recently used figure files beyond maxsize."""
+        files = []
+        for path in self.directory.glob("*.json"):
+            try:
+                files.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                # deleted by another process
+                continue
+        for _, old in sorted(files)[: -self.maxsize]:
+            old.unlink(missing_ok=True)
+
+    def _remember(self, key: str, fig_json: str) -> None:
+        with self._lock:
+            self._figures[key] = fig_json
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.maxsize:
+                self._figures.popitem(last=False)
@@ -0,0 +1,23 @@
+"""Health check route for the production server."""
+import os
+import sqlite3
+
+import flask
+
+from dash_app.callbacks import TABLES, store
+
+
+def health() -> flask.Response:
+    """Report whether this server process can read the table store.
+
+    Returns:
+        flask.Response: json with the status, process id and the table
+            versions, status 503 if the database cannot be read
+    """
+    try:
+        versions = {name: store.version(name) for name in TABLES}
+    except sqlite3.Error as err:
+        response = flask.jsonify(status="error", error=str(err))
+        response.status_code = 503
+        return response
+    return flask.jsonify(status="ok", pid=os.getpid(), tables=versions)
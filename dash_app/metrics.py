@@ -0,0 +1,61 @@
+"""Routes exposing the stage timings of the planners."""
+import flask
+
+from dash_app.callbacks import (
+    PROFILE_REQUEST,
+    PROFILE_RESULT,
+    metrics_cache,
+)
+from src.metrics import Registry
+
+REGISTRY_KEY = "registry"
+
+
+def collect() -> Registry:
+    """Merge the observations queued by all processes into the registry.
+
+    The registry is kept in the metrics cache, so every server process
+    serves the same histograms.
+
+    Returns:
+        Registry: histograms of all processes
+    """
+    with metrics_cache.transact():
+        registry = metrics_cache.get(REGISTRY_KEY) or Registry()
+        while True:
+            _, observations = metrics_cache.pull()
+            if observations is None:
+                break
+            registry.merge(observations)
+        metrics_cache.set(REGISTRY_KEY, registry)
+    return registry
+
+
+def metrics() -> flask.Response:
+    """Serve the stage histograms in the Prometheus text format.
+
+    Returns:
+        flask.Response: metrics text
+    """
+    return flask.Response(
+        collect().render(), mimetype="text/plain; version=0.0.4"
+    )
+
+
+def profile() -> flask.Response:
+    """Request a profile of the next plan render or serve the last one.
+
+    Returns:
+        flask.Response: cProfile statistics for GET, 202 for POST
+    """
+    if flask.request.method == "POST":
+        metrics_cache.set(PROFILE_REQUEST, True)
+        return flask.Response(
+            "The next plan render will be profiled.\n",
+            status=202,
+            mimetype="text/plain",
+        )
+    stats = metrics_cache.get(PROFILE_RESULT)
+    if stats is None:
+        flask.abort(404)
+    return flask.Response(stats, mimetype="text/plain")
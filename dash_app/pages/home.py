@@ -11,6 +11,8 @@ from dash import html, dash_table, dcc
 import dash_mantine_components as dmc
 from datetime import datetime, date
 
+from src.schedule import RESOLUTIONS, WEEKDAYS
+
 dash.register_page(
     __name__,
     path="/",
@@ -41,6 +43,8 @@ date_picker = dbc.Row(
 fs_table = dash_table.DataTable(
     id="font_sizes", editable=True, row_deletable=True
 )
+fs_version = dcc.Store(id="font_sizes-version")
+fs_edits = dcc.Store(id="font_sizes-edits")
 
 col_btn2 = (
     dbc.Button(
@@ -56,6 +60,8 @@ collapse2 = html.Div(
         dbc.Collapse(
             [
                 dbc.Row(fs_table),
+                fs_version,
+                fs_edits,
                 dbc.Row(
                     dbc.Col(
                         html.Button(
@@ -72,8 +78,16 @@ collapse2 = html.Div(
 )
 
 data_table = dash_table.DataTable(
-    id="timetable", editable=True, row_deletable=True
+    id="timetable",
+    editable=True,
+    row_deletable=True,
+    dropdown={
+        "Tag": {"options": [{"label": day, "value": day} for day in WEEKDAYS]}
+    },
 )
+data_version = dcc.Store(id="timetable-version")
+data_edits = dcc.Store(id="timetable-edits")
+plan_state = dcc.Store(id="tt-graph-state")
 
 color_btn_link = dbc.Button(
     "Link to available colors",
@@ -85,6 +99,8 @@ layout = dbc.Container(
         dbc.Row(html.H1("Home")),
         date_picker,
         dbc.Row(data_table),
+        data_version,
+        data_edits,
         dbc.Row(
             dbc.Col(
                 html.Button("Add Row", id="editing-rows-button", n_clicks=0),
@@ -123,15 +139,54 @@ layout = dbc.Container(
                     ],
                     width=3,
                 ),
+                dbc.Col(
+                    [
+                        html.Label("Time grid"),
+                        dcc.Dropdown(
+                            [
+                                {"value": minutes, "label": f"{minutes} min"}
+                                for minutes in RESOLUTIONS
+                            ],
+                            60,
+                            id="plan-resolution",
+                            clearable=False,
+                        ),
+                    ],
+                    width=3,
+                ),
             ]
         ),
         dbc.Row(
             dbc.Col(
-                html.Button("Create Plan", id="create-plan", n_clicks=0),
+                [
+                    html.Button("Create Plan", id="create-plan", n_clicks=0),
+                    html.Button(
+                        "Cancel", id="cancel-plan", n_clicks=0, disabled=True
+                    ),
+                ],
                 width=3,
             )
         ),
-        dbc.Row(dcc.Graph(id="tt-graph")),
+        dbc.Row(
+            dbc.Progress(id="plan-progress", value=0, style={"display": "none"})
+        ),
+        dbc.Row(
+            dbc.Col(
+                [
+                    html.Span("Export: "),
+                    *(
+                        html.A(
+                            fmt.upper(),
+                            id=f"export-{fmt}",
+                            download=f"Helpdeskplan.{fmt}",
+                            className="me-2",
+                        )
+                        for fmt in ("png", "svg", "pdf")
+                    ),
+                ]
+            )
+        ),
+        dbc.Row([dcc.Graph(id="tt-graph"), plan_state]),
     ],
     fluid=True,
 )
@@ -0,0 +1,123 @@
+"""Serve the planner with a production WSGI server.
+
+    python -m dash_app.serve --workers 4 --threads 8 --port 8050
+
+gunicorn runs several worker processes with several threads each. Where it
+is not available, e.g. on Windows, waitress serves from one process with
+several threads. All processes share the table store, the caches and the
+metrics through the database and the cache directory. Every worker loads
+the tables and fills its caches before it serves requests.
+"""
+import argparse
+import importlib.util
+import os
+
+WSGI_SERVERS = ("gunicorn", "waitress")
+
+
+def warm_up() -> None:
+    """Fill the caches of a server process before it serves requests."""
+    from dash_app import callbacks
+
+    for name in callbacks.TABLES:
+        callbacks.store.load(name)
+    callbacks.logo_source()
+    callbacks.timetable_conflicts(callbacks.store.version("timetable"))
+
+
+def create_server():
+    """Create the WSGI application of the planner with warm caches.
+
+    Returns:
+        flask.Flask: server of the dash app
+    """
+    from dash_app.app import app
+
+    warm_up()
+    return app.server
+
+
+def run_gunicorn(args: argparse.Namespace) -> None:
+    """Serve with gunicorn worker processes.
+
+    Args:
+        args (argparse.Namespace): command line arguments
+    """
+    from gunicorn.app.base import BaseApplication
+
+    class PlannerApplication(BaseApplication):
+        def load_config(self) -> None:
+            self.cfg.set("bind", f"{args.host}:{args.port}")
+            self.cfg.set("workers", args.workers)
+            self.cfg.set("threads", args.threads)
+            self.cfg.set("timeout", args.timeout)
+
+        def load(self):
+            # runs in every worker, so each one warms its own caches
+            return create_server()
+
+    PlannerApplication().run()
+
+
+def run_waitress(args: argparse.Namespace) -> None:
+    """Serve with waitress threads in this process.
+
+    Args:
+        args (argparse.Namespace): command line arguments
+    """
+    from waitress import serve
+
+    if args.workers > 1:
+        print("waitress runs one process, --workers is ignored.")
+    serve(
+        create_server(),
+        host=args.host,
+        port=args.port,
+        threads=args.threads,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8050)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=min(4, os.cpu_count() or 1),
+        help="number of worker processes (gunicorn only)",
+    )
+    parser.add_argument(
+        "--threads", type=int, default=4, help="threads per worker"
+    )
+    parser.add_argument(
+        "--timeout",
+        type=int,
+        default=120,
+        help="seconds before a silent worker is restarted (gunicorn only)",
+    )
+    parser.add_argument(
+        "--server",
+        choices=WSGI_SERVERS,
+        default=next(
+            (
+                server
+                for server in WSGI_SERVERS
+                if importlib.util.find_spec(server) is not None
+            ),
+            "waitress",
+        ),
+        help="WSGI server (default: gunicorn if installed, else waitress)",
+    )
+    args = parser.parse_args()
+
+    # must be set before the store is created on import of the app
+    os.environ["PLANNER_SHARED_STORE"] = "1"
+    if args.server == "gunicorn":
+        run_gunicorn(args)
+    else:
+        run_waitress(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,475 @@
+"""SQLite backed storage of the timetable and font size tables."""
+import atexit
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import AbstractContextManager, closing, nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import pandas as pd
+
+ROW_ID = "id"
+logger = logging.getLogger(__name__)
+
+
+def records(df: pd.DataFrame) -> list:
+    """Get the rows of a table as dicts, missing values as None.
+
+    Args:
+        df (pd.DataFrame): table
+
+    Returns:
+        list: list of row dicts
+    """
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+@dataclass
+class RowEdits:
+    """Row edits of a queued table since the version they were made on."""
+
+    base: str | None  # version of the table the edits were made on
+    changed: dict = field(default_factory=dict)  # rows by ROW_ID
+    deleted: set = field(default_factory=set)  # ids of deleted rows
+    appended: set = field(default_factory=set)  # ids of appended rows
+
+    def merge(self, later: "RowEdits") -> "RowEdits":
+        """Add edits that were made after these.
+
+        Args:
+            later (RowEdits): later edits
+
+        Returns:
+            RowEdits: these edits, updated
+        """
+        for row_id in later.deleted:
+            self.changed.pop(row_id, None)
+        self.deleted |= later.deleted
+        self.changed.update(later.changed)
+        self.appended |= later.appended
+        return self
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Replay the edits onto another version of the table.
+
+        Appended rows whose id was taken in the meantime get a new id.
+
+        Args:
+            df (pd.DataFrame): table
+
+        Returns:
+            pd.DataFrame: edited table
+        """
+        rows = {row[ROW_ID]: row for row in records(df)}
+        for row_id in self.deleted:
+            rows.pop(row_id, None)
+        next_id = max([-1, *rows, *self.changed]) + 1
+        for row_id, row in self.changed.items():
+            if row_id in self.appended and row_id in rows:
+                row_id, next_id = next_id, next_id + 1
+            rows[row_id] = {col: row.get(col) for col in df.columns}
+            rows[row_id][ROW_ID] = row_id
+        return pd.DataFrame(list(rows.values()), columns=df.columns)
+
+
+class TableStore:
+    """Store tables in SQLite, writing changes from a background thread.
+
+    Saving only queues a table; a writer thread waits for delay seconds to
+    coalesce bursts of edits and then writes the latest version of every
+    queued table in one transaction. Tables whose content did not change
+    are never queued. Tables missing in the database are imported from
+    the csv file of the same name.
+
+    The content hash of a table serves as its version. The last versions
+    are kept in memory, so clients can be sent only what changed since
+    the version they have.
+
+    Every row has a stable id in the column ROW_ID, so clients can send
+    edits of single rows instead of whole tables.
+
+    When several server processes share the database, a lock shared by the
+    processes is passed. The writer thread holds it while it writes a
+    table. If another process wrote the table since it was loaded, the
+    queued row edits are replayed onto that version, so no edits are lost.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        delay: float = 1.0,
+        history_size: int = 16,
+        lock: AbstractContextManager | None = None,
+    ) -> None:
+        """Initialize the TableStore class.
+
+        Args:
+            path (Path): path to the database file
+            delay (float, optional): seconds to wait for further edits
+                before writing. Defaults to 1.0.
+            history_size (int, optional): number of table versions to keep
+                in memory. Defaults to 16.
+            lock (AbstractContextManager | None, optional): reentrant lock
+                shared with other processes, e.g. a diskcache.RLock.
+                Defaults to None for a store used by one process.
+        """
+        self.path = path
+        self.delay = delay
+        self.history_size = history_size
+        self._pending: dict[str, pd.DataFrame] = {}
+        # row edits of every queued table, None if it was saved as a whole
+        self._edits: dict[str, RowEdits | None] = {}
+        self._hashes: dict[str, str] = {}
+        self._history: OrderedDict[str, pd.DataFrame] = OrderedDict()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._edit_lock = threading.Lock()
+        self._shared_lock = lock if lock is not None else nullcontext()
+        self._wake = threading.Event()
+        self._writer: threading.Thread | None = None
+        with self._connect() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS versions"
+                " (name TEXT PRIMARY KEY, hash TEXT)"
+            )
+        atexit.register(self.flush)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def content_hash(df: pd.DataFrame) -> str:
+        """Get a hash of the content of a table.
+
+        Args:
+            df (pd.DataFrame): table
+
+        Returns:
+            str: hex digest
+        """
+        return hashlib.sha256(df.to_csv(index=False).encode()).hexdigest()
+
+    def version(self, name: str) -> str | None:
+        """Get the current version of a table without loading it.
+
+        Args:
+            name (str): table name
+
+        Returns:
+            str | None: content hash, None if the table was never saved
+        """
+        with self._lock:
+            if name in self._pending:
+                return self._hashes[name]
+        with self._connect() as con:
+            row = con.execute(
+                "SELECT hash FROM versions WHERE name=?", (name,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def snapshot(self, version: str) -> pd.DataFrame | None:
+        """Get an earlier version of a table from memory.
+
+        Args:
+            version (str): content hash of the table
+
+        Returns:
+            pd.DataFrame | None: table, None if it is no longer kept
+        """
+        with self._lock:
+            df = self._history.get(version)
+        return None if df is None else df.copy()
+
+    def load(self, name: str) -> tuple[pd.DataFrame, str]:
+        """Load a table, including edits that are not written yet.
+
+        Args:
+            name (str): table name
+
+        Returns:
+            tuple[pd.DataFrame, str]: (table, version)
+        """
+        with self._lock:
+            if name in self._pending:
+                return self._pending[name].copy(), self._hashes[name]
+        df, version = self._read(name)
+        if df is None:
+            df = pd.read_csv(self.path.parent / f"{name}.csv")
+        if version is None or ROW_ID not in df.columns:
+            df.insert(0, ROW_ID, range(len(df)))
+            self.save(name, df)
+            return df, self._hashes[name]
+        with self._lock:
+            if name not in self._pending:
+                self._hashes[name] = version
+            self._remember(version, df)
+        return df.copy(), version
+
+    def _read(self, name: str) -> tuple[pd.DataFrame | None, str | None]:
+        """Read a table and its version from the database.
+
+        Args:
+            name (str): table name
+
+        Returns:
+            tuple[pd.DataFrame | None, str | None]: (table, version), the
+                table is None if it is not in the database
+        """
+        with self._connect() as con:
+            exists = con.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+                (name,),
+            ).fetchone()
+            if not exists:
+                return None, None
+            df = pd.read_sql(f'SELECT * FROM "{name}"', con)
+            row = con.execute(
+                "SELECT hash FROM versions WHERE name=?", (name,)
+            ).fetchone()
+        return df, row[0] if row else self.content_hash(df)
+
+    def save(self, name: str, df: pd.DataFrame) -> None:
+        """Queue a table for writing if its content changed.
+
+        Args:
+            name (str): table name
+            df (pd.DataFrame): table
+        """
+        self._queue(name, df, None)
+
+    def _queue(
+        self, name: str, df: pd.DataFrame, edits: RowEdits | None
+    ) -> None:
+        """Queue a table for the writer thread.
+
+        Args:
+            name (str): table name
+            df (pd.DataFrame): table
+            edits (RowEdits | None): row edits that turned the loaded
+                version into df, None if df replaces the table as a whole
+        """
+        digest = self.content_hash(df)
+        with self._lock:
+            if self._hashes.get(name) == digest:
+                return
+            queued = self._edits.get(name)
+            if name in self._pending and (queued is None or edits is None):
+                edits = None
+            elif name in self._pending:
+                edits = queued.merge(edits)
+            self._hashes[name] = digest
+            self._pending[name] = df.copy()
+            self._edits[name] = edits
+            self._remember(digest, self._pending[name])
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._run, name="table-store-writer", daemon=True
+                )
+                self._writer.start()
+        self._wake.set()
+
+    def edit_rows(
+        self, name: str, changed: list = (), deleted: list = ()
+    ) -> str:
+        """Apply row edits of a client to a table.
+
+        Args:
+            name (str): table name
+            changed (list, optional): changed rows as dicts, matched by
+                ROW_ID. Rows with an unknown id are appended. Defaults to ().
+            deleted (list, optional): ids of deleted rows. Defaults to ().
+
+        Returns:
+            str: version after the edits
+        """
+        with self._edit_lock:
+            df, version = self.load(name)
+            rows = {row[ROW_ID]: row for row in records(df)}
+            edits = RowEdits(version)
+            for row_id in deleted:
+                if rows.pop(row_id, None) is not None:
+                    edits.deleted.add(row_id)
+            for row in changed:
+                if row[ROW_ID] not in rows:
+                    edits.appended.add(row[ROW_ID])
+                rows[row[ROW_ID]] = {col: row.get(col) for col in df.columns}
+                edits.changed[row[ROW_ID]] = rows[row[ROW_ID]]
+            self._queue(
+                name,
+                pd.DataFrame(list(rows.values()), columns=df.columns),
+                edits,
+            )
+            return self.version(name)
+
+    def append_row(self, name: str) -> str:
+        """Append an empty row with a new id to a table.
+
+        Args:
+            name (str): table name
+
+        Returns:
+            str: version after appending
+        """
+        with self._edit_lock:
+            df, version = self.load(name)
+            row = {col: "" for col in df.columns}
+            row[ROW_ID] = int(df[ROW_ID].max()) + 1 if len(df) else 0
+            self._queue(
+                name,
+                pd.concat([df, pd.DataFrame([row])], ignore_index=True),
+                RowEdits(
+                    version, changed={row[ROW_ID]: row}, appended={row[ROW_ID]}
+                ),
+            )
+            return self.version(name)
+
+    def flush(self) -> None:
+        """Write all queued tables.
+
+        Every table is written while holding the lock shared with other
+        processes. If the database has another version than the one the
+        row edits were made on, they are replayed onto that version.
+        """
+        with self._flush_lock:
+            with self._lock:
+                names = list(self._pending)
+                self._wake.clear()
+            for name in names:
+                with self._lock:
+                    queued, edits = self._pending[name], self._edits[name]
+                    # later edits are made on the version written now
+                    self._edits[name] = RowEdits(self._hashes[name])
+                try:
+                    df = self._flush_table(name, queued, edits)
+                except Exception:
+                    self._requeue(name, queued, edits)
+                    raise
+                self._written(name, queued, df)
+
+    def _flush_table(
+        self, name: str, queued: pd.DataFrame, edits: RowEdits | None
+    ) -> pd.DataFrame:
+        """Write one queued table unless the database already has it.
+
+        Args:
+            name (str): table name
+            queued (pd.DataFrame): queued table
+            edits (RowEdits | None): row edits of the queued table
+
+        Returns:
+            pd.DataFrame: table in the database
+        """
+        with self._shared_lock:
+            with self._connect() as con:
+                row = con.execute(
+                    "SELECT hash FROM versions WHERE name=?", (name,)
+                ).fetchone()
+            version = row[0] if row else None
+            df = queued
+            if edits is not None and version not in (None, edits.base):
+                current, version = self._read(name)
+                if current is not None:
+                    df = edits.apply(current)
+            digest = self.content_hash(df)
+            if version != digest:
+                self._write(name, df, digest)
+        return df
+
+    def _requeue(
+        self, name: str, queued: pd.DataFrame, edits: RowEdits | None
+    ) -> None:
+        """Restore the row edits of a table that could not be written.
+
+        Args:
+            name (str): table name
+            queued (pd.DataFrame): queued table
+            edits (RowEdits | None): row edits of the queued table
+        """
+        with self._lock:
+            later = self._edits[name]
+            if self._pending.get(name) is queued:
+                self._edits[name] = edits
+            elif edits is None or later is None:
+                self._edits[name] = None
+            else:
+                self._edits[name] = edits.merge(later)
+
+    def _written(
+        self, name: str, queued: pd.DataFrame, df: pd.DataFrame
+    ) -> None:
+        """Update the queue after a table was written.
+
+        Args:
+            name (str): table name
+            queued (pd.DataFrame): queued table
+            df (pd.DataFrame): table in the database, differs from the
+                queued one if edits of other processes were merged
+        """
+        with self._lock:
+            if self._pending.get(name) is queued:
+                del self._pending[name]
+                del self._edits[name]
+            elif self._edits[name] is not None and df is not queued:
+                # replay the edits made while writing onto the merged table
+                df = self._edits[name].apply(df)
+                self._pending[name] = df
+            elif df is not queued:
+                # the table was saved as a whole while writing
+                return
+            if df is not queued:
+                digest = self.content_hash(df)
+                self._hashes[name] = digest
+                self._remember(digest, df)
+
+    def _write(self, name: str, df: pd.DataFrame, digest: str) -> None:
+        """Replace a table and its version in the database.
+
+        The table is written under a temporary name and renamed in one
+        transaction, so readers never see it missing or half written. The
+        temporary name is unique per process and thread, so concurrent
+        writers never rename each other's table.
+
+        Args:
+            name (str): table name
+            df (pd.DataFrame): table
+            digest (str): content hash of the table
+        """
+        staging = f"{name}__staging_{os.getpid()}_{threading.get_ident()}"
+        with closing(self._connect()) as con:
+            df.to_sql(staging, con, if_exists="replace", index=False)
+            con.isolation_level = None
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                con.execute(f'DROP TABLE IF EXISTS "{name}"')
+                con.execute(f'ALTER TABLE "{staging}" RENAME TO "{name}"')
+                con.execute(
+                    "INSERT OR REPLACE INTO versions VALUES (?, ?)",
+                    (name, digest),
+                )
+            except sqlite3.Error:
+                con.execute("ROLLBACK")
+                raise
+            con.execute("COMMIT")
+
+    def _remember(self, version: str, df: pd.DataFrame) -> None:
+        self._history[version] = df
+        self._history.move_to_end(version)
+        while len(self._history) > self.history_size:
+            self._history.popitem(last=False)
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            time.sleep(self.delay)
+            try:
+                self.flush()
+            except Exception:  # pylint: disable=broad-except
+                # the tables stay queued, try again after the next delay
+                logger.exception("Writing the tables to %s failed", self.path)
+                self._wake.set()
@@ -0,0 +1,101 @@
+"""Detection of double bookings of tutors and rooms."""
+from bisect import bisect_left, insort
+from collections.abc import Hashable
+
+KINDS = ("tutor", "room")
+
+
+class ConflictIndex:
+    """Bookings by tutor and by room, updated one row at a time.
+
+    Bookings are bucketed by kind, name and weekday and kept sorted by start
+    time, so an update only looks at the bookings of the same tutor or room
+    on the same day instead of the whole timetable. Bookings that only touch
+    do not conflict.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the ConflictIndex class."""
+        self.version: str | None = None
+        self._bookings: dict[Hashable, tuple[list[tuple], int, int]] = {}
+        self._buckets: dict[tuple, list[tuple[int, int, Hashable]]] = {}
+        self._conflicts: dict[str, dict[Hashable, set]] = {
+            kind: {} for kind in KINDS
+        }
+
+    def clear(self) -> None:
+        """Remove all bookings."""
+        self.__init__()
+
+    def update(
+        self,
+        row_id: Hashable,
+        day: int,
+        start: int,
+        end: int,
+        tutor: str | None,
+        room: str | None,
+    ) -> None:
+        """Add a booking or replace the booking of a row.
+
+        Args:
+            row_id (Hashable): id of the row
+            day (int): weekday
+            start (int): start in minutes since midnight
+            end (int): end in minutes since midnight
+            tutor (str | None): tutor, not checked if empty
+            room (str | None): room, not checked if empty
+        """
+        self.remove(row_id)
+        if end <= start:
+            return
+        keys = []
+        for kind, name in zip(KINDS, (tutor, room)):
+            if not name:
+                continue
+            key = (kind, name, day)
+            bucket = self._buckets.setdefault(key, [])
+            # bookings starting before the end, overlapping if they end later
+            for _, other_end, other in bucket[: bisect_left(bucket, (end,))]:
+                if other_end > start:
+                    self._link(kind, row_id, other)
+            insort(bucket, (start, end, row_id))
+            keys.append(key)
+        self._bookings[row_id] = (keys, start, end)
+
+    def remove(self, row_id: Hashable) -> None:
+        """Remove the booking of a row, if it has one.
+
+        Args:
+            row_id (Hashable): id of the row
+        """
+        entry = self._bookings.pop(row_id, None)
+        if entry is None:
+            return
+        keys, start, end = entry
+        for key in keys:
+            bucket = self._buckets[key]
+            del bucket[bisect_left(bucket, (start, end, row_id))]
+            if not bucket:
+                del self._buckets[key]
+        for conflicts in self._conflicts.values():
+            for other in conflicts.pop(row_id, ()):
+                conflicts[other].discard(row_id)
+                if not conflicts[other]:
+                    del conflicts[other]
+
+    def conflicting(self, kind: str) -> set:
+        """Get the rows that are double booked.
+
+        Args:
+            kind (str): "tutor" or "room"
+
+        Returns:
+            set: row ids
+        """
+        return set(self._conflicts[kind])
+
+    def _link(self, kind: str, row_id: Hashable, other: Hashable) -> None:
+        conflicts = self._conflicts[kind]
+        conflicts.setdefault(row_id, set()).add(other)
+        conflicts.setdefault(other, set()).add(row_id)
@@ -0,0 +1,202 @@
+"""Export the excel plans of many weeks in parallel.
+
+Either one input workbook is exported for a range of ISO weeks
+    python src/export_weeks.py --weeks 2024-W15 2024-W30
+or every workbook in a directory is exported for the week in its sheet "KW"
+    python src/export_weeks.py --input-dir Listen
+"""
+import argparse
+import datetime as dt
+import os
+import pathlib
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+if __package__ in (None, ""):
+    # run as a script, make the src package importable
+    sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from src.go import OUTPUT_PATH, SLOTS, export_week  # noqa: E402
+from src.schedule import RESOLUTIONS, SlotIndex  # noqa: E402
+
+
+def parse_week(week_str: str) -> dt.date:
+    """Parse an ISO week like "2024-W15" into the monday of that week.
+
+    Args:
+        week_str (str): ISO week
+
+    Returns:
+        dt.date: monday of the week
+    """
+    match = re.fullmatch(r"(\d{4})-?W(\d{1,2})", week_str)
+    if match is None:
+        raise argparse.ArgumentTypeError(f"Invalid ISO week: {week_str!r}")
+    return dt.date.fromisocalendar(int(match[1]), int(match[2]), 1)
+
+
+def parse_time(time_str: str) -> int:
+    """Parse a time like "7:30" or "24:00" into minutes since midnight.
+
+    Args:
+        time_str (str): time
+
+    Returns:
+        int: minutes since midnight
+    """
+    match = re.fullmatch(r"(\d{1,2}):(\d{2})", time_str)
+    if match is None or int(match[2]) >= 60:
+        raise argparse.ArgumentTypeError(f"Invalid time: {time_str!r}")
+    return 60 * int(match[1]) + int(match[2])
+
+
+def week_range(first: dt.date, last: dt.date) -> list[dt.date]:
+    """Get the mondays of all weeks from first to last.
+
+    Args:
+        first (dt.date): monday of the first week
+        last (dt.date): monday of the last week
+
+    Returns:
+        list[dt.date]: mondays
+    """
+    return [
+        first + dt.timedelta(weeks=i)
+        for i in range((last - first).days // 7 + 1)
+    ]
+
+
+def output_path(out_dir: pathlib.Path, date: dt.date) -> pathlib.Path:
+    """Get the output path of the plan of a week.
+
+    Args:
+        out_dir (pathlib.Path): output directory
+        date (dt.date): a date in the week
+
+    Returns:
+        pathlib.Path: path to the output workbook
+    """
+    year, week, _ = date.isocalendar()
+    return out_dir / f"{OUTPUT_PATH.stem}_{year}_KW{week:02}.xlsx"
+
+
+def main() -> int:
+    """Run the export.
+
+    Returns:
+        int: exit code, 1 if any week failed
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        "--weeks",
+        nargs=2,
+        type=parse_week,
+        metavar=("FIRST", "LAST"),
+        help="range of ISO weeks, e.g. 2024-W15 2024-W30",
+    )
+    source.add_argument(
+        "--input-dir",
+        type=pathlib.Path,
+        help="directory with one input workbook per week",
+    )
+    parser.add_argument(
+        "--input",
+        type=pathlib.Path,
+        default=OUTPUT_PATH.parent / "Liste.xlsm",
+        help="input workbook for --weeks (default: Liste.xlsm)",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=pathlib.Path,
+        default=OUTPUT_PATH.parent,
+        help="directory for the plans (default: project directory)",
+    )
+    parser.add_argument(
+        "--day-start",
+        type=parse_time,
+        default=SLOTS.day_start,
+        help="time of the first row of the template (default: 8:00)",
+    )
+    parser.add_argument(
+        "--day-end",
+        type=parse_time,
+        default=SLOTS.day_end,
+        help="end time of the last row of the template (default: 24:00)",
+    )
+    parser.add_argument(
+        "--resolution",
+        type=int,
+        choices=RESOLUTIONS,
+        default=SLOTS.resolution,
+        help="minutes per row of the template (default: 30)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=min(4, os.cpu_count() or 1),
+        help="number of worker processes",
+    )
+    args = parser.parse_args()
+    try:
+        slots = SlotIndex(args.day_start, args.day_end, args.resolution)
+    except ValueError as err:
+        parser.error(str(err))
+
+    if args.weeks is not None:
+        jobs = [
+            (args.input, output_path(args.output_dir, date), date)
+            for date in week_range(*args.weeks)
+        ]
+    else:
+        # the week is read from the sheet "KW" by the worker
+        jobs = [
+            (
+                inpath,
+                args.output_dir / f"{OUTPUT_PATH.stem}_{inpath.stem}.xlsx",
+                None,
+            )
+            for inpath in sorted(args.input_dir.glob("*.xls[xm]"))
+            if not inpath.name.startswith("~$")
+        ]
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+
+    start = time.perf_counter()
+    totals: dict[str, float] = {}
+    failed = []
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {
+            pool.submit(export_week, inpath, outpath, date, slots): (
+                inpath,
+                outpath,
+            )
+            for inpath, outpath, date in jobs
+        }
+        for future in as_completed(futures):
+            inpath, outpath = futures[future]
+            name = outpath.name
+            try:
+                timings = future.result()
+            except Exception as err:  # pylint: disable=broad-except
+                failed.append(name)
+                print(f"FAILED {name} ({inpath.name}): {err!r}")
+                continue
+            for stage, sec in timings.items():
+                totals[stage] = totals.get(stage, 0) + sec
+            print(f"Created {name} in {sum(timings.values()):.2f}s")
+
+    print(
+        f"{len(jobs) - len(failed)}/{len(jobs)} plans created in "
+        f"{time.perf_counter() - start:.2f}s with {args.workers} workers."
+    )
+    for stage, sec in totals.items():
+        print(f"  {stage:<10}{sec:8.2f}s")
+    if failed:
+        print("Failed:", ", ".join(sorted(failed)))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
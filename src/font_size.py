@@ -1,15 +1,227 @@
-import ctypes
-
-def get_text_dims(text, points, font):
-    class SIZE(ctypes.Structure):
-            _fields_ = [("cx", ctypes.c_long), ("cy", ctypes.c_long)]
-    size = SIZE(0, 0)
-    if text:
-        hdc = ctypes.windll.user32.GetDC(0)
-        hfont = ctypes.windll.gdi32.CreateFontA(points, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, font)
-        hfont_old = ctypes.windll.gdi32.SelectObject(hdc, hfont)
-        ctypes.windll.gdi32.GetTextExtentPoint32A(hdc, text, len(text), ctypes.byref(size))
-        ctypes.windll.gdi32.SelectObject(hdc, hfont_old)
-        ctypes.windll.gdi32.DeleteObject(hfont)
-
-    return (size.cx, size.cy)
\ No newline at end of file
+"""Measure text extents from the glyph metrics of a TrueType font.
+
+The advance widths of a font are read once from its TTF file, strings are
+measured by summing the widths of their glyphs. Results are kept in a
+bounded LRU cache, get_text_dims.cache_info() reports hits and misses.
+"""
+import pathlib
+import struct
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+FONT_DIRS = [
+    pathlib.Path(__file__).parents[1] / "fonts",
+    pathlib.Path.home() / ".fonts",
+    pathlib.Path.home() / ".local" / "share" / "fonts",
+    pathlib.Path("/usr/share/fonts"),
+    pathlib.Path("/usr/local/share/fonts"),
+    pathlib.Path("/Library/Fonts"),
+    pathlib.Path("C:/Windows/Fonts"),
+]
+FONT_FILES = {
+    "arial": [
+        "arial.ttf",
+        "Arial.ttf",
+        "LiberationSans-Regular.ttf",
+        "DejaVuSans.ttf",
+    ],
+}
+
+
+@dataclass(frozen=True)
+class FontMetrics:
+    """Horizontal metrics of a font in font units."""
+
+    units_per_em: int
+    cell_height: int
+    advances: np.ndarray
+    cmap: dict
+
+    def text_width(self, text: str) -> float:
+        """Get the summed advance width of a string in font units.
+
+        Args:
+            text (str): text to measure
+
+        Returns:
+            float: width in font units
+        """
+        glyphs = [self.cmap.get(ord(char), 0) for char in text]
+        # glyphs past the last metric share its advance width
+        glyphs = np.minimum(glyphs, len(self.advances) - 1)
+        return float(self.advances[glyphs].sum())
+
+
+def _read_cmap(data: bytes, offset: int) -> dict:
+    """Read the unicode character to glyph mapping of a cmap table.
+
+    Args:
+        data (bytes): font file content
+        offset (int): offset of the cmap table
+
+    Returns:
+        dict: mapping of code point to glyph id
+    """
+    (n_tables,) = struct.unpack_from(">H", data, offset + 2)
+    subtables = {}
+    for i in range(n_tables):
+        platform, encoding, sub_offset = struct.unpack_from(
+            ">HHI", data, offset + 4 + 8 * i
+        )
+        subtables[(platform, encoding)] = offset + sub_offset
+    for key in [(3, 10), (0, 4), (3, 1), (0, 3)]:
+        if key not in subtables:
+            continue
+        start = subtables[key]
+        (fmt,) = struct.unpack_from(">H", data, start)
+        if fmt == 12:
+            return _read_cmap_12(data, start)
+        if fmt == 4:
+            return _read_cmap_4(data, start)
+    return {}
+
+
+def _read_cmap_4(data: bytes, start: int) -> dict:
+    """Read a format 4 (segment mapping) cmap subtable."""
+    (seg_x2,) = struct.unpack_from(">H", data, start + 6)
+    n_seg = seg_x2 // 2
+    ends = struct.unpack_from(f">{n_seg}H", data, start + 14)
+    starts = struct.unpack_from(f">{n_seg}H", data, start + 16 + seg_x2)
+    deltas = struct.unpack_from(f">{n_seg}h", data, start + 16 + 2 * seg_x2)
+    range_pos = start + 16 + 3 * seg_x2
+    range_offsets = struct.unpack_from(f">{n_seg}H", data, range_pos)
+    cmap = {}
+    for i in range(n_seg):
+        for char in range(starts[i], ends[i] + 1):
+            if char == 0xFFFF:
+                continue
+            if range_offsets[i] == 0:
+                glyph = (char + deltas[i]) & 0xFFFF
+            else:
+                pos = (
+                    range_pos
+                    + 2 * i
+                    + range_offsets[i]
+                    + 2 * (char - starts[i])
+                )
+                (glyph,) = struct.unpack_from(">H", data, pos)
+                if glyph:
+                    glyph = (glyph + deltas[i]) & 0xFFFF
+            cmap[char] = glyph
+    return cmap
+
+
+def _read_cmap_12(data: bytes, start: int) -> dict:
+    """Read a format 12 (segmented coverage) cmap subtable."""
+    (n_groups,) = struct.unpack_from(">I", data, start + 12)
+    cmap = {}
+    for i in range(n_groups):
+        first, last, glyph = struct.unpack_from(
+            ">III", data, start + 16 + 12 * i
+        )
+        for char in range(first, last + 1):
+            cmap[char] = glyph + char - first
+    return cmap
+
+
+def read_font(path: pathlib.Path) -> FontMetrics:
+    """Read the horizontal metrics of a TrueType font file.
+
+    Args:
+        path (pathlib.Path): path to the .ttf file
+
+    Returns:
+        FontMetrics: metrics of the font
+    """
+    data = path.read_bytes()
+    (n_tables,) = struct.unpack_from(">H", data, 4)
+    tables = {}
+    for i in range(n_tables):
+        tag, _, offset, _ = struct.unpack_from(">4sIII", data, 12 + 16 * i)
+        tables[tag.decode("latin-1")] = offset
+    (units_per_em,) = struct.unpack_from(">H", data, tables["head"] + 18)
+    ascender, descender = struct.unpack_from(">hh", data, tables["hhea"] + 4)
+    (n_metrics,) = struct.unpack_from(">H", data, tables["hhea"] + 34)
+    cell_height = ascender - descender
+    if "OS/2" in tables:
+        # GDI sizes the character cell by the windows ascent and descent
+        win_ascent, win_descent = struct.unpack_from(
+            ">HH", data, tables["OS/2"] + 74
+        )
+        cell_height = win_ascent + win_descent
+    advances = np.array(
+        struct.unpack_from(f">{2 * n_metrics}H", data, tables["hmtx"])[::2],
+        dtype=np.int64,
+    )
+    return FontMetrics(
+        units_per_em=units_per_em,
+        cell_height=cell_height,
+        advances=advances,
+        cmap=_read_cmap(data, tables["cmap"]),
+    )
+
+
+def find_font(font: str) -> pathlib.Path | None:
+    """Find the TrueType file of a font family.
+
+    Args:
+        font (str): font family or path to a .ttf file
+
+    Returns:
+        pathlib.Path | None: path to the font file, None if not installed
+    """
+    if font.lower().endswith(".ttf") and pathlib.Path(font).is_file():
+        return pathlib.Path(font)
+    names = FONT_FILES.get(font.lower(), []) + [f"{font}.ttf"]
+    for name in names:
+        for font_dir in FONT_DIRS:
+            if not font_dir.is_dir():
+                continue
+            path = next(font_dir.rglob(name), None)
+            if path is not None:
+                return path
+    return None
+
+
+@lru_cache(maxsize=None)
+def load_font(font: str) -> FontMetrics | None:
+    """Load the metrics of a font family once.
+
+    Args:
+        font (str): font family or path to a .ttf file
+
+    Returns:
+        FontMetrics | None: metrics, None if the font is not installed
+    """
+    path = find_font(font)
+    if path is None:
+        print(
+            f"Font {font!r} not found, estimating text widths.",
+            file=sys.stderr,
+        )
+        return None
+    return read_font(path)
+
+
+@lru_cache(maxsize=4096)
+def get_text_dims(text: str, points: int, font: str) -> tuple[int, int]:
+    """Get the size of a text in pixels.
+
+    Args:
+        text (str): text to measure
+        points (int): height of the character cell in pixels
+        font (str): font family or path to a .ttf file
+
+    Returns:
+        tuple[int, int]: (width, height)
+    """
+    if not text:
+        return (0, 0)
+    metrics = load_font(font)
+    if metrics is None:
+        return (round(0.5 * points * len(text)), points)
+    width = metrics.text_width(text) * points / metrics.cell_height
+    return (round(width), points)
@@ -1,318 +1,778 @@
 """Script to fill excel sheet according to data provided in other excel sheet."""
+import hashlib
+import io
+import itertools
+import json
+import os
+import sys
+import tempfile
 import pandas as pd
-import xlwings as xw
 import pathlib
 import openpyxl as xl
+from openpyxl.workbook.workbook import Workbook
 from openpyxl.worksheet.worksheet import Worksheet
 from openpyxl.styles import Font, Border, Side, PatternFill
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet
+from openpyxl.worksheet.dimensions import ColumnDimension, RowDimension
 import datetime as dt
-import time
+from copy import copy, deepcopy
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+if __package__ in (None, ""):
+    # run as a script, make the src package importable
+    sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from src.metrics import StageTimer  # noqa: E402
+from src.schedule import WEEKDAYS, ScheduleFrame, SlotIndex  # noqa: E402
+
+TEMPLATE_PATH = pathlib.Path(__file__).parents[1] / "Template.xlsx"
+OUTPUT_PATH = pathlib.Path(__file__).parents[1] / "Ergebnis.xlsx"
+START_COLS = [4, 6, 8, 10, 12, 14, 16, 18]
+FIRST_ROW = 5
+SLOTS = SlotIndex(day_start=8 * 60, day_end=24 * 60, resolution=30)
+COLORS = {
+    "Rüsselsheim": "E2EFDA",
+    "WBS": "DDEBF7",
+    "online": "FFF2CC",
+    "KSR": "F8CBAD",
+}
+ROOMS = {
+    "Rüsselsheim": "G007",
+    "WBS": "II-02",
+    "online": "online",
+    "KSR": "KSR",
+}
+SIDECAR_SUFFIX = ".cache.json"
+STYLE_ATTRS = (
+    "font",
+    "fill",
+    "border",
+    "alignment",
+    "number_format",
+    "protection",
+)
+# sheet settings that are copied as a whole from the template
+SHEET_ATTRS = (
+    "sheet_format",
+    "sheet_properties",
+    "views",
+    "page_margins",
+    "print_options",
+    "HeaderFooter",
+    "protection",
+    "auto_filter",
+    "row_breaks",
+    "col_breaks",
+    "data_validations",
+)
+_template_cache: dict[pathlib.Path, tuple[float, bytes]] = {}
+
+
+# Styles are created once and shared by reference between all cells, so
+# the workbook style table stays small.
+@lru_cache(maxsize=None)
+def solid_fill(color: str) -> PatternFill:
+    """Get the solid fill of a color.
 
+    Args:
+        color (str): hex color
 
-class Termin:
-    """Class containing information about the events."""
+    Returns:
+        PatternFill: shared fill
+    """
+    return PatternFill(start_color=color, end_color=color, fill_type="solid")
 
-    instances = []
-    wt_dict = {
-        "Montag": 0,
-        "Dienstag": 1,
-        "Mittwoch": 2,
-        "Donnerstag": 3,
-        "Freitag": 4,
-        "Samstag": 5,
-        "Sonntag": 6,
-    }
-    start_cols = [4, 6, 8, 10, 12, 14, 16]
-    cur_col: int = 4
+
+@lru_cache(maxsize=None)
+def border_side(style: str | None) -> Side | None:
+    """Get a black border side.
+
+    Args:
+        style (str | None): border style, None for no border
+
+    Returns:
+        Side | None: shared side
+    """
+    if style is None:
+        return None
+    return Side(border_style=style, color="000000")
+
+
+@lru_cache(maxsize=None)
+def event_border(
+    left: bool, right: bool, top: str | None, bottom: str | None
+) -> Border:
+    """Get the border of an event cell.
+
+    Args:
+        left (bool): medium border on the left
+        right (bool): medium border on the right
+        top (str | None): style of the top border
+        bottom (str | None): style of the bottom border
+
+    Returns:
+        Border: shared border
+    """
+    return Border(
+        left=border_side("medium" if left else None),
+        right=border_side("medium" if right else None),
+        top=border_side(top),
+        bottom=border_side(bottom),
+    )
+
+
+@lru_cache(maxsize=None)
+def event_font(bold: bool) -> Font:
+    """Get the font of an event description.
+
+    Args:
+        bold (bool): bold font
+
+    Returns:
+        Font: shared font
+    """
+    return Font(bold=bold)
+
+
+class Plan:
+    """Events of one week and the column layout of its worksheet.
+
+    Every plan owns its events and column offsets, so independent plans can
+    be built side by side, e.g. in a thread or process pool.
+    """
 
     def __init__(
         self,
-        wt: str,
-        start: dt.time,
-        finish: dt.time,
-        tutor: str,
-        sp: tuple[str, str],
-        ort: str,
+        frame: ScheduleFrame,
+        start_cols: list[int] | None = None,
+        slots: SlotIndex = SLOTS,
     ) -> None:
-        """Initialize the Termin class.
+        """Initialize the Plan class.
 
         Args:
-            wt (str): weekday
-            start (dt.time): start time
-            finish (dt.time): end time
-            tutor (str): name of tutor
-            sp (str): knowledge area of tutor
-            ort (str): location
+            frame (ScheduleFrame): events
+            start_cols (list[int] | None, optional): first column of every
+                weekday followed by the first column after Sonntag.
+                Defaults to START_COLS.
+            slots (SlotIndex, optional): time rows of the worksheet, the
+                first one in row FIRST_ROW. Defaults to SLOTS.
         """
-        self.wt = wt
-        self.tutor = tutor
-        self.start = start
-        self.finish = finish
-        self.sp = sp
-        self.ort = ort
-        self.deu = []
-        if not self in self.__class__.instances:
-            self.__class__.instances.append(self)
-        self.cols = self.day_to_cols()
-        self.rows = self.time_to_row()
-        self.col_add = None
-
-    def __str__(self) -> str:
-        """Get string representation.
+        self.frame = frame
+        self.start_cols = np.array(
+            START_COLS if start_cols is None else start_cols
+        )
+        self.rows = slots.rows(frame.start, frame.end) + FIRST_ROW
+        self.cols = np.column_stack(
+            [
+                self.start_cols[frame.day],
+                self.start_cols[frame.day + 1] - 1,
+            ]
+        )
+
+    @classmethod
+    def from_liste(cls, df: pd.DataFrame, slots: SlotIndex = SLOTS) -> "Plan":
+        """Create a plan from the rows of the sheet "Liste".
+
+        Args:
+            df (pd.DataFrame): events with the columns day, start, end,
+                tutor, two knowledge areas and location
+            slots (SlotIndex, optional): time rows of the worksheet.
+                Defaults to SLOTS.
 
         Returns:
-            str: string description.
+            Plan: plan with assigned columns
         """
-        return "\n" + "\n".join(
-            [f"{pair[0]}: {pair[1]}" for pair in list(vars(self).items())]
-        )
+        plan = cls(ScheduleFrame.from_liste(df, COLORS), slots=slots)
+        plan.assign_cols()
+        return plan
 
-    def check_overlap(self) -> None:
-        """Check if other Class object overlap timewise."""
-        for termin in self.instances:
-            if not self == termin and termin.wt == self.wt:
-                if (
-                    (termin.start <= self.start < termin.finish)
-                    or (termin.start < self.finish <= termin.finish)
-                    or (self.start <= termin.start < self.finish)
-                    or (self.start < termin.finish <= self.finish)
-                ):
-                    self.deu.append(termin)
-
-    def correct_cols(self) -> None:
-        """Correct columns if overlap exists."""
-        if len(self.deu) > 0:
-            col_pos = [termin.col_add for termin in self.deu if termin != self if termin.col_add is not None] or [-1]
-            for i in range(max(col_pos) + 2):
-                if i not in col_pos:
-                    self.col_add = i
-                    break
-            day_cols = self.day_to_cols()
-            self.cols = [day_cols[0] + self.col_add, day_cols[0] + self.col_add]
-            if day_cols[0] + self.col_add >= day_cols[1] + 1:
-                self.__class__.start_cols[
-                    self.__class__.wt_dict[self.wt] + 1 :
-                ] = [
-                    col + 1
-                    for col in self.__class__.start_cols[
-                        self.__class__.wt_dict[self.wt] + 1 :
-                    ]
-                ]
-        else:
-            self.cols = self.day_to_cols()
-
-    def day_to_cols(self) -> list:
-        """Translate weekdays into column numbers.
+    def assign_cols(self) -> None:
+        """Assign columns to all events, placing overlapping ones side by side.
 
-        Returns:
-            tuple: (start_col, end_col)
+        Days with more parallel events than columns push the following days
+        to the right.
         """
-        return [
-            self.__class__.start_cols[self.__class__.wt_dict[self.wt]],
-            self.__class__.start_cols[self.__class__.wt_dict[self.wt] + 1] - 1,
-        ]
+        frame = self.frame
+        frame.layout()
+        day_widths = np.maximum(
+            np.diff(self.start_cols), frame.day_lanes(len(self.start_cols) - 1)
+        )
+        self.start_cols = self.start_cols[0] + np.concatenate(
+            [[0], np.cumsum(day_widths)]
+        )
+        first_col = self.start_cols[frame.day]
+        overlap = frame.width > 1
+        self.cols = np.column_stack(
+            [
+                np.where(overlap, first_col + frame.lane, first_col),
+                np.where(
+                    overlap,
+                    first_col + frame.lane,
+                    self.start_cols[frame.day + 1] - 1,
+                ),
+            ]
+        )
+
+    def grid(self) -> "CellGrid":
+        """Build the styles and values of all cells of the events.
 
-    def time_to_row(self) -> tuple:
-        """Translate start and finish times into rows.
+        Events are drawn in order, so later events overwrite the fill,
+        border, font and value of earlier ones cell by cell. The outer
+        columns of an event get borders, the first row a medium top border,
+        the last row a medium bottom border and the rows in between hair
+        borders.
 
         Returns:
-            tuple: (start_row, end_row)
+            CellGrid: cells of the plan
         """
-        finish_dt = dt.datetime.combine(dt.datetime.now().date(), self.finish)
-        start_dt = dt.datetime.combine(dt.datetime.now().date(), self.start)
-        first_row = dt.datetime.combine(dt.datetime.now().date(), dt.time(8, 0))
-        lower_diff = start_dt - first_row
-        upper_diff = finish_dt - first_row
-
-        start_row = (
-            lower_diff.seconds // 3600 * 2
-            + (lower_diff.seconds % 3600) // 1800
-            + 5
+        rows, cols, frame = self.rows, self.cols, self.frame
+        shape = (
+            int(max(rows.max(initial=0), rows[:, 0].max(initial=0) + 2)) + 1,
+            int(cols.max(initial=0)) + 1,
         )
-        end_row = (
-            upper_diff.seconds // 3600 * 2
-            + (upper_diff.seconds % 3600) // 1800
-            + 4
+        # per attribute ids into the tables below, 0 keeps the template
+        fill = np.zeros(shape, dtype=np.int32)
+        border = np.zeros(shape, dtype=np.int32)
+        font = np.zeros(shape, dtype=np.int8)
+        fills: dict[str, int] = {}
+        borders: dict[tuple, int] = {}
+        values: dict[tuple[int, int], object] = {}
+        for i in range(len(frame)):
+            (r0, r1), (c0, c1) = rows[i].tolist(), cols[i].tolist()
+            color = frame.color[i]
+            fill[r0 : r1 + 1, c0 : c1 + 1] = fills.setdefault(
+                color, len(fills) + 1
+            )
+            for col in {c0, c1}:
+                edges = (col == c0, col == c1)
+                for row_slice, sides in (
+                    (slice(r0, r0 + 1), ("medium", None)),
+                    (slice(r0 + 1, r1), ("hair", "hair")),
+                    (slice(r1, r1 + 1), (None, "medium")),
+                ):
+                    border[row_slice, col] = borders.setdefault(
+                        edges + sides, len(borders) + 1
+                    )
+
+            sp = (frame.subject[i], frame.subject2[i])
+            values[r0, c0] = frame.tutor[i]
+            if r1 - r0 > 2:
+                values[r0 + 1, c0], values[r0 + 2, c0] = sp
+            else:
+                values[r0 + 1, c0] = "".join(str(sp))
+            values[r1, c0] = ROOMS[frame.location[i]]
+            for row, bold in ((r0, 2), (r0 + 1, 1), (r0 + 2, 1), (r1, 2)):
+                font[row, c0] = bold
+
+        keys, style_ids = np.unique(
+            np.stack([fill, border, font], axis=-1).reshape(-1, 3),
+            axis=0,
+            return_inverse=True,
         )
+        fill_table = [None] + [solid_fill(color) for color in fills]
+        border_table = [None] + [event_border(*key) for key in borders]
+        font_table = [None, event_font(bold=False), event_font(bold=True)]
+        return CellGrid(
+            styles=[
+                (fill_table[f], border_table[b], font_table[t])
+                for f, b, t in keys.tolist()
+            ],
+            style_ids=style_ids.reshape(shape),
+            values=values,
+        )
+
 
-        return (start_row, end_row)
+@dataclass
+class CellGrid:
+    """Styles and values of the cells of a plan.
 
-    def fill_colors(self, ws: Worksheet) -> None:
-        """Fill the excel sheet with the corresponding color.
+    Attributes:
+        styles (list[tuple]): (fill, border, font) of every style id, None
+            keeps the style of the template cell
+        style_ids (np.ndarray): style id of every cell, indexed by row and
+            column like the worksheet, so row and column 0 are unused
+        values (dict[tuple[int, int], object]): values by (row, column)
+    """
+
+    styles: list[tuple]
+    style_ids: np.ndarray
+    values: dict[tuple[int, int], object]
+
+    def style(self, row: int, col: int) -> int:
+        """Get the style id of a cell, also outside of the grid.
 
         Args:
-            ws (Worksheet): output Worksheet
+            row (int): row
+            col (int): column
+
+        Returns:
+            int: style id, -1 for cells without events
         """
-        cols = {"Rüsselsheim": "E2EFDA", "WBS": "DDEBF7", "online": "FFF2CC", "KSR":"F8CBAD"}
-        color = cols[self.ort]
-        for rows in ws.iter_rows(
-            min_row=self.rows[0],
-            max_row=self.rows[1],
-            min_col=self.cols[0],
-            max_col=self.cols[1],
-        ):
-            for cell in rows:
-                cell.fill = PatternFill(
-                    start_color=color, end_color=color, fill_type="solid"
-                )
+        n_rows, n_cols = self.style_ids.shape
+        if row < n_rows and col < n_cols:
+            return int(self.style_ids[row, col])
+        return -1
 
-    def add_border(self, ws: Worksheet) -> None:
-        """Add borders into excel worksheet.
+    def write(self, ws: Worksheet) -> None:
+        """Apply the styles and values to a loaded worksheet.
 
         Args:
-            ws (Worksheet): output Worksheet
+            ws (Worksheet): output worksheet
         """
-        med = Side(border_style="medium", color="000000")
-        dot = Side(border_style="hair", color="000000", style="dotted")
-        for i in range(self.rows[0], self.rows[1] + 1):
-            for j in range(self.cols[0], self.cols[1] + 1):
-                cell = ws.cell(i, j)
-                if i == self.rows[0]:
-                    if j == self.cols[0]:
-                        if j == self.cols[1]:
-                            cell.border = Border(top=med, left=med, right=med)
-                        else:
-                            cell.border = Border(top=med, left=med)
-                    elif j == self.cols[1]:
-                        cell.border = Border(top=med, right=med)
-                if i == self.rows[1]:
-                    if j == self.cols[0]:
-                        if j == self.cols[1]:
-                            cell.border = Border(
-                                bottom=med, left=med, right=med
-                            )
-                        else:
-                            cell.border = Border(bottom=med, left=med)
-                    elif j == self.cols[1]:
-                        cell.border = Border(bottom=med, right=med)
-                if not i == self.rows[0] and not i == self.rows[1]:
-                    if j == self.cols[0]:
-                        if j == self.cols[1]:
-                            cell.border = Border(
-                                left=med, right=med, bottom=dot, top=dot
-                            )
-                        else:
-                            cell.border = Border(left=med, bottom=dot, top=dot)
-                    elif j == self.cols[1]:
-                        cell.border = Border(right=med, bottom=dot, top=dot)
-
-    def add_desc(self, ws: Worksheet):
-        """Add description text to the event in the output worksheet.
+        for (row, col), style_id in np.ndenumerate(self.style_ids):
+            fill, border, font = self.styles[style_id]
+            if fill is None and border is None and font is None:
+                continue
+            cell = ws.cell(row, col)
+            for attr, value in (
+                ("fill", fill),
+                ("border", border),
+                ("font", font),
+            ):
+                if value is not None:
+                    setattr(cell, attr, value)
+        for (row, col), value in self.values.items():
+            ws.cell(row, col).value = value
+
+    def save(self, outpath: pathlib.Path, template: Worksheet | None) -> None:
+        """Stream the plan into a write only workbook, one row at a time.
+
+        The cells and the sheet settings of the template are copied, the
+        plan is drawn on top of them. Templates with content that cannot be
+        streamed, like images, charts, tables, comments or hyperlinks, are
+        filled and saved as loaded instead.
 
         Args:
-            ws (Worksheet): output worksheet
+            outpath (pathlib.Path): path to the output workbook
+            template (Worksheet | None): template sheet, None for an empty
+                sheet
         """
-        room_dict = {"Rüsselsheim": "G007", "WBS": "II-02", "online": "online", "KSR":"KSR"}
-        name_cell = ws.cell(self.rows[0], self.cols[0])
-        exp_cell = ws.cell(self.rows[0] + 1, self.cols[0])
-        exp2_cell = ws.cell(self.rows[0] + 2, self.cols[0])
-        ort_cell = ws.cell(self.rows[1], self.cols[0])
-        name_cell.value = self.tutor
-        name_cell.font = Font(bold=True)
-        if self.rows[1] - self.rows[0] > 2:
-            exp_cell.value, exp2_cell.value = self.sp
-        else:
-            exp_cell.value = "".join(str(self.sp))
-        exp_cell.font = Font(bold=False)
-        exp2_cell.font = Font(bold=False)
-        ort_cell.value = room_dict[self.ort]
-        ort_cell.font = Font(bold=True)
-
-
-def load_template() -> pathlib.Path:
-    """Load the template excel worksheet.
+        if template is not None and not streamable(template):
+            self.write(template)
+            template.parent.save(outpath)
+            return
+        wb = xl.Workbook(write_only=True)
+        ws = wb.create_sheet("Wochenplan")
+        n_rows, n_cols = (dim - 1 for dim in self.style_ids.shape)
+        if template is not None:
+            copy_layout(template, ws)
+            n_rows = max(n_rows, template.max_row)
+            n_cols = max(n_cols, template.max_column)
+        n_rows = max([n_rows, *(row for row, _ in self.values)])
+        n_cols = max([n_cols, *(col for _, col in self.values)])
+        template_rows = (
+            template.iter_rows(max_row=n_rows, max_col=n_cols)
+            if template is not None
+            else itertools.repeat([None] * n_cols)
+        )
+        # one styled prototype per template style and plan style
+        prototypes: dict[tuple[int, int], StyleArray | None] = {}
+        for row, template_row in zip(range(1, n_rows + 1), template_rows):
+            cells = []
+            for col, template_cell in zip(range(1, n_cols + 1), template_row):
+                style_id = self.style(row, col)
+                template_style = (
+                    template_cell.style_id
+                    if template_cell is not None and template_cell.has_style
+                    else 0
+                )
+                key = (template_style, style_id)
+                if key not in prototypes:
+                    prototypes[key] = cell_style(
+                        ws,
+                        template_cell if template_style else None,
+                        self.styles[style_id] if style_id >= 0 else (),
+                    )
+                value = self.values.get(
+                    (row, col),
+                    None if template_cell is None else template_cell.value,
+                )
+                if prototypes[key] is None:
+                    cells.append(value)
+                    continue
+                cell = WriteOnlyCell(ws, value)
+                style_array(cell, prototypes[key])
+                cells.append(cell)
+            ws.append(cells)
+        wb.save(outpath)
+
+
+# openpyxl has no public API to copy all styles of a cell at once or to
+# list the images and charts of a sheet. Only the two helpers below touch
+# its internals, they were checked against openpyxl 3.1.2.
+
+
+def style_array(cell: Cell, style: StyleArray | None = None) -> StyleArray:
+    """Get the style of a cell as a whole, or set it to a copy of style.
+
+    Setting a single style attribute registers it with the workbook, which
+    is slow for every cell of a sheet. If openpyxl renames the attribute,
+    setting it raises, since cells only have slots.
+
+    Args:
+        cell (Cell): cell
+        style (StyleArray | None, optional): style to set, it must belong
+            to the workbook of the cell. Defaults to None.
+
+    Returns:
+        StyleArray: style of the cell
+    """
+    # pylint: disable=protected-access
+    if style is not None:
+        cell._style = copy(style)
+    return cell._style
+
+
+def sheet_drawings(ws: Worksheet) -> list | None:
+    """Get the images and charts of a sheet.
+
+    Args:
+        ws (Worksheet): sheet
 
     Returns:
-        pathlib.Path: Path to the ouput file.
+        list | None: images and charts, None if openpyxl keeps them
+            elsewhere
     """
-    path1 = pathlib.Path(__file__).parents[1] / "Template.xlsx"
-    path2 = pathlib.Path(__file__).parents[1] / "Ergebnis.xlsx"
+    # pylint: disable=protected-access
+    try:
+        return [*ws._images, *ws._charts]
+    except AttributeError:
+        return None
 
-    wb1 = xw.Book(path1)
-    wb2 = xw.Book()
 
-    ws1 = wb1.sheets(1)
-    ws1.copy(before=wb2.sheets[0])
-    wb2.save(path2)
-    wb2.app.quit()
+def streamable(template: Worksheet) -> bool:
+    """Check if a template sheet can be copied to a write only sheet.
 
-    wb = xl.load_workbook(path2)
-    sheet_names = wb.sheetnames
-    for sheet in sheet_names[1:]:
+    Args:
+        template (Worksheet): template sheet
+
+    Returns:
+        bool: False if the sheet has images, charts, tables, comments or
+            hyperlinks, or its drawings are unknown
+    """
+    if sheet_drawings(template) != [] or template.tables:
+        return False
+    return not any(
+        cell.comment is not None or cell.hyperlink is not None
+        for row in template.iter_rows()
+        for cell in row
+    )
+
+
+def copy_styles(source, target) -> None:
+    """Copy the styles of a cell or dimension to another workbook.
+
+    Args:
+        source: styled cell, column or row dimension of the template
+        target: cell, column or row dimension of the output sheet
+    """
+    if source.has_style:
+        for attr in STYLE_ATTRS:
+            setattr(target, attr, copy(getattr(source, attr)))
+
+
+def copy_layout(template: Worksheet, ws: WriteOnlyWorksheet) -> None:
+    """Copy the sheet layout of the template to a write only sheet.
+
+    Args:
+        template (Worksheet): template sheet
+        ws (WriteOnlyWorksheet): output sheet, before any row is written
+    """
+    for key, dim in template.column_dimensions.items():
+        # a dimension spans the columns from min to max
+        col = ColumnDimension(
+            ws,
+            index=key,
+            width=dim.width,
+            bestFit=dim.bestFit,
+            hidden=dim.hidden,
+            outlineLevel=dim.outlineLevel,
+            collapsed=dim.collapsed,
+        )
+        col.min, col.max = dim.min, dim.max
+        copy_styles(dim, col)
+        ws.column_dimensions[key] = col
+    for key, dim in template.row_dimensions.items():
+        row = RowDimension(
+            ws,
+            index=key,
+            ht=dim.ht,
+            hidden=dim.hidden,
+            outlineLevel=dim.outlineLevel,
+            collapsed=dim.collapsed,
+        )
+        copy_styles(dim, row)
+        ws.row_dimensions[key] = row
+    for merged in template.merged_cells.ranges:
+        ws.merged_cells.add(merged.coord)
+    for attr in SHEET_ATTRS:
+        setattr(ws, attr, deepcopy(getattr(template, attr)))
+    for attr in template.page_setup.__attrs__:
+        setattr(ws.page_setup, attr, getattr(template.page_setup, attr))
+    for cf in template.conditional_formatting:
+        for rule in cf.rules:
+            ws.conditional_formatting.add(str(cf.sqref), deepcopy(rule))
+    ws.print_title_rows = template.print_title_rows
+    ws.print_title_cols = template.print_title_cols
+    if template.print_area:
+        ws.print_area = [
+            area.split("!")[-1] for area in template.print_area.split(",")
+        ]
+
+
+def cell_style(
+    ws: WriteOnlyWorksheet, template_cell: Cell | None, style: tuple
+) -> StyleArray | None:
+    """Get the style of a cell of the output sheet.
+
+    Args:
+        ws (WriteOnlyWorksheet): output sheet
+        template_cell (Cell | None): styled template cell
+        style (tuple): (fill, border, font) of the plan, None or an empty
+            tuple keep the template style
+
+    Returns:
+        StyleArray | None: style of the output workbook, None if the cell
+            has the default style
+    """
+    if template_cell is None and all(value is None for value in style):
+        return None
+    cell = WriteOnlyCell(ws)
+    if template_cell is not None:
+        copy_styles(template_cell, cell)
+    for attr, value in zip(("fill", "border", "font"), style):
+        if value is not None:
+            setattr(cell, attr, value)
+    return style_array(cell)
+
+
+def load_template(path: pathlib.Path = TEMPLATE_PATH) -> Workbook:
+    """Load the template excel workbook, keeping only its first sheet.
+
+    The file content is cached in memory until the template changes.
+
+    Args:
+        path (pathlib.Path, optional): path to the template.
+            Defaults to TEMPLATE_PATH.
+
+    Returns:
+        Workbook: workbook with the sheet "Wochenplan"
+    """
+    mtime = path.stat().st_mtime
+    cached = _template_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, path.read_bytes())
+        _template_cache[path] = cached
+    wb = xl.load_workbook(io.BytesIO(cached[1]))
+    for sheet in wb.sheetnames[1:]:
         wb.remove(wb[sheet])
-    ws = wb[sheet_names[0]]
-    ws.title = "Wochenplan"
-    wb.save(path2)
-    return path2
+    wb.worksheets[0].title = "Wochenplan"
+    return wb
+
+
+def clean_liste(df: pd.DataFrame) -> pd.DataFrame:
+    """Clean the events of the sheet "Liste" and sort them by weekday.
+
+    All cells are converted to text, which is how the planner reads them.
+
+    Args:
+        df (pd.DataFrame): sheet "Liste" as read by pandas
+
+    Returns:
+        pd.DataFrame: events
+    """
+    df = df.dropna(subset="Anfangszeit")
+    df = df.fillna(" ").astype(str)
+    df["Tag"] = pd.Categorical(df["Tag"], list(WEEKDAYS))
+    return df.sort_values(["Tag"])
 
 
-def write_text(inpath: pathlib.Path, ws: Worksheet) -> None:
-    """Write the timeframe of the plan into the excel.
+def file_hash(path: pathlib.Path) -> str:
+    """Get the sha256 of a file.
 
     Args:
-        inpath (pathlib.Path): input path for the date
-        ws (Worksheet): output worksheet
+        path (pathlib.Path): path to the file
+
+    Returns:
+        str: hex digest
     """
-    df = pd.read_excel(inpath, sheet_name="KW")
-    date: dt.datetime = pd.to_datetime(df.iloc[0, 0])  # type: ignore
-    cal_week_str = date.strftime("%V")
-    cal_week_date = date.strftime("%G %V")
-    startdate = time.asctime(time.strptime(f"{cal_week_date} 0", "%Y %W %w"))
-    startdate = dt.datetime.strptime(startdate, "%a %b %d %H:%M:%S %Y")
-    friday = startdate - dt.timedelta(days=2)
-    monday = startdate - dt.timedelta(days=6)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(2**20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sidecar_path(inpath: pathlib.Path) -> pathlib.Path:
+    """Get the path of the parsed copy of an input workbook.
+
+    Args:
+        inpath (pathlib.Path): path to the input workbook
+
+    Returns:
+        pathlib.Path: hidden file next to the workbook
+    """
+    return inpath.with_name(f".{inpath.name}{SIDECAR_SUFFIX}")
+
+
+def read_sidecar(path: pathlib.Path) -> dict | None:
+    """Read the parsed copy of an input workbook.
+
+    Args:
+        path (pathlib.Path): path to the sidecar
+
+    Returns:
+        dict | None: mtime, size, hash, events and date of the workbook,
+            None if the sidecar is missing or cannot be read
+    """
+    try:
+        entry = json.loads(path.read_text(encoding="utf-8"))
+        liste = pd.DataFrame(entry["rows"], columns=entry["columns"])
+        liste["Tag"] = pd.Categorical(liste["Tag"], list(WEEKDAYS))
+        return {
+            "mtime": int(entry["mtime"]),
+            "size": int(entry["size"]),
+            "sha256": str(entry["sha256"]),
+            "liste": liste,
+            "date": dt.date.fromisoformat(entry["date"]),
+        }
+    except Exception:  # pylint: disable=broad-except
+        # a broken or outdated sidecar is read again from the workbook
+        return None
+
+
+def write_sidecar(path: pathlib.Path, entry: dict) -> None:
+    """Replace the sidecar atomically, ignoring read only directories.
+
+    Args:
+        path (pathlib.Path): path to the sidecar
+        entry (dict): mtime, size, hash, events and date of the workbook
+    """
+    liste = entry["liste"]
+    data = {
+        "mtime": entry["mtime"],
+        "size": entry["size"],
+        "sha256": entry["sha256"],
+        "date": entry["date"].isoformat(),
+        "columns": liste.columns.tolist(),
+        "rows": liste.astype(object).where(liste.notna(), None).values.tolist(),
+    }
+    try:
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def read_input(inpath: pathlib.Path) -> tuple[pd.DataFrame, dt.date]:
+    """Read the events and the date of the plan from the input workbook.
+
+    The workbook is opened once for the sheets "Liste" and "KW". The parsed
+    result is kept as json in a sidecar file next to the workbook and
+    reused while the mtime and size, or else the content hash, of the
+    workbook match.
+
+    Args:
+        inpath (pathlib.Path): path to the input workbook
+
+    Returns:
+        tuple[pd.DataFrame, dt.date]: events and a date in the week of
+            the plan
+    """
+    sidecar = sidecar_path(inpath)
+    stat = inpath.stat()
+    cached = read_sidecar(sidecar)
+    if cached is not None and (cached["mtime"], cached["size"]) == (
+        stat.st_mtime_ns,
+        stat.st_size,
+    ):
+        return cached["liste"], cached["date"]
+
+    digest = file_hash(inpath)
+    if cached is None or cached["sha256"] != digest:
+        with pd.ExcelFile(inpath, engine="openpyxl") as xls:
+            liste = clean_liste(xls.parse("Liste"))
+            kw = xls.parse("KW")
+        date = pd.to_datetime(kw.iloc[0, 0]).date()
+        cached = {"sha256": digest, "liste": liste, "date": date}
+    # also refresh the mtime of a touched but unchanged workbook
+    cached.update(mtime=stat.st_mtime_ns, size=stat.st_size)
+    write_sidecar(sidecar, cached)
+    return cached["liste"], cached["date"]
+
+
+def week_text(date: dt.date) -> str:
+    """Get the timeframe of the plan.
+
+    Args:
+        date (dt.date): a date in the week of the plan
+
+    Returns:
+        str: title line of the plan
+    """
+    year, week, _ = date.isocalendar()
+    monday = dt.date.fromisocalendar(year, week, 1)
+    friday = monday + dt.timedelta(days=4)
     friday_str = friday.strftime("%d.%m.%Y")
     monday_str = monday.strftime("%d.%m.%Y")
-    out_str = (
-        f"Helpdeskplan für KW {cal_week_str} von {monday_str} bis {friday_str}."
-    )
-    ws.cell(2, 1).value = out_str
+    return f"Helpdeskplan für KW {week:02} von {monday_str} bis {friday_str}."
+
+
+def export_week(
+    inpath: pathlib.Path,
+    outpath: pathlib.Path,
+    date: dt.date | None = None,
+    slots: SlotIndex = SLOTS,
+) -> dict[str, float]:
+    """Create the excel plan of one week.
+
+    Args:
+        inpath (pathlib.Path): path to the input workbook
+        outpath (pathlib.Path): path to the output workbook
+        date (dt.date | None, optional): a date in the week of the plan.
+            Defaults to the date in the sheet "KW" of the input.
+        slots (SlotIndex, optional): time rows of the worksheet, they have
+            to match the template. Defaults to SLOTS.
+
+    Returns:
+        dict[str, float]: seconds spent in every stage
+    """
+    timer = StageTimer("excel.")
+    with timer.stage("read") as obs:
+        df, week = read_input(inpath)
+        date = week if date is None else date
+        obs.rows = len(df)
+
+    with timer.stage("layout", rows=len(df)):
+        plan = Plan.from_liste(df, slots)
+
+    with timer.stage("template"):
+        template = load_template()["Wochenplan"]
+
+    with timer.stage("write", rows=len(df)):
+        grid = plan.grid()
+        grid.values[2, 1] = week_text(date)
+
+    with timer.stage("save"):
+        grid.save(outpath, template)
+    return timer.timings()
 
 
 if __name__ == "__main__":
     print("Reading input data -> 'Liste.xlsm'")
     inpath = pathlib.Path(__file__).parents[1] / "Liste.xlsm"
-    df = pd.read_excel(inpath, sheet_name="Liste")
-    df = df.dropna(subset="Anfangszeit")
-    df["Tag"] = pd.Categorical(
-        df["Tag"],
-        [
-            "Montag",
-            "Dienstag",
-            "Mittwoch",
-            "Donnerstag",
-            "Freitag",
-            "Samstag",
-            "Sonntag",
-        ],
+    timings = export_week(inpath, OUTPUT_PATH)
+    print(
+        "Created plan in",
+        ", ".join(f"{stage} {sec:.2f}s" for stage, sec in timings.items()),
     )
-    df = df.sort_values(["Tag"])
-    df = df.fillna(" ")
-    print("Creating classes.")
-    for index, row in df.iterrows():
-        day, start, end, tutor, sp1, sp2, location = row
-        sp: tuple = (sp1, sp2)
-        termin = Termin(day, start, end, tutor, sp, location)
-    for t in Termin.instances:
-        t.check_overlap()
-    print("Loading template -> 'Template.xlsx'")
-    path = load_template()
-    wb = xl.load_workbook(path)
-    ws = wb[wb.sheetnames[0]]
-    for t in Termin.instances:
-        if len(t.deu) > 0:
-            t.correct_cols()
-    for t in Termin.instances:
-        if len(t.deu) == 0:
-            t.correct_cols()
-    for t in Termin.instances:
-        t.fill_colors(ws)
-        t.add_border(ws)
-        t.add_desc(ws)
-    print("Writing data to file -> Ergebnis.xlsx")
-    write_text(inpath, ws)
-
-    wb.save(path)
     print("Created plan. Output in file -> Ergebnis.xlsx")
     print(
         "+" * 60,
@@ -0,0 +1,69 @@
+"""Interval partitioning of events into side-by-side lanes.
+
+Used by the excel planner (src/go.py) and the dash planner
+(dash_app/callbacks.py) to place overlapping events next to each other.
+"""
+import heapq
+from typing import Hashable, Sequence
+
+import numpy as np
+
+
+def assign_lanes(
+    starts: Sequence,
+    ends: Sequence,
+    groups: Sequence[Hashable] | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Assign every event the lowest free lane in O(n log n).
+
+    Events are swept in order of their start time. A heap of active events
+    (ordered by end time) releases lanes as soon as an event has finished,
+    a second heap hands out the lowest released lane. Events that only
+    touch (one ends when the next starts) do not overlap.
+
+    Args:
+        starts (Sequence): start of every event, any comparable type
+        ends (Sequence): end of every event, same type as starts
+        groups (Sequence[Hashable] | None, optional): events of different
+            groups (e.g. weekdays) never share an overlap group.
+            Defaults to None.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (lane, width) for every event in input
+            order. width is the number of lanes used by the overlap group
+            the event belongs to, so 1 means the event overlaps nothing.
+    """
+    n = len(starts)
+    starts = list(starts)
+    ends = list(ends)
+    groups = [0] * n if groups is None else list(groups)
+    order = sorted(range(n), key=lambda i: (groups[i], starts[i], ends[i]))
+    lanes = np.zeros(n, dtype=int)
+    widths = np.ones(n, dtype=int)
+
+    active: list = []
+    free: list[int] = []
+    next_lane = 0
+    cluster: list[int] = []
+    cur_group = None
+    for i in order:
+        if cluster and groups[i] != cur_group:
+            active.clear()
+        while active and active[0][0] <= starts[i]:
+            heapq.heappush(free, heapq.heappop(active)[1])
+        if not active:
+            widths[cluster] = next_lane
+            cluster = []
+            free = []
+            next_lane = 0
+            cur_group = groups[i]
+        if free:
+            lane = heapq.heappop(free)
+        else:
+            lane = next_lane
+            next_lane += 1
+        heapq.heappush(active, (ends[i], lane))
+        lanes[i] = lane
+        cluster.append(i)
+    widths[cluster] = next_lane
+    return lanes, widths
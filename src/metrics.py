@@ -0,0 +1,184 @@
+"""Lightweight timing of pipeline stages.
+
+Stages of a run are timed with a StageTimer. The observations are merged
+into a Registry of histograms, which can be rendered in the Prometheus text
+format.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@dataclass
+class Observation:
+    """Duration and row count of one stage."""
+
+    stage: str
+    seconds: float = 0.0
+    rows: int = 0
+
+
+class StageTimer:
+    """Collect the observations of the stages of one run."""
+
+    def __init__(self, prefix: str = "") -> None:
+        """Initialize the StageTimer class.
+
+        Args:
+            prefix (str, optional): prefix of all stage names, e.g. "chart.".
+                Defaults to "".
+        """
+        self.prefix = prefix
+        self.observations: list[Observation] = []
+
+    @contextmanager
+    def stage(self, name: str, rows: int = 0):
+        """Time the body of the with statement.
+
+        The row count can also be set on the yielded observation.
+
+        Args:
+            name (str): stage name
+            rows (int, optional): number of rows processed. Defaults to 0.
+
+        Yields:
+            Observation: observation of the stage
+        """
+        observation = Observation(self.prefix + name, rows=rows)
+        start = time.perf_counter()
+        try:
+            yield observation
+        finally:
+            observation.seconds = time.perf_counter() - start
+            self.observations.append(observation)
+
+    def timings(self) -> dict[str, float]:
+        """Get the seconds spent in every stage.
+
+        Returns:
+            dict[str, float]: seconds by stage name without prefix
+        """
+        timings: dict[str, float] = {}
+        for obs in self.observations:
+            name = obs.stage.removeprefix(self.prefix)
+            timings[name] = timings.get(name, 0.0) + obs.seconds
+        return timings
+
+
+@dataclass
+class Histogram:
+    """Distribution of the durations of one stage."""
+
+    counts: list[int] = field(default_factory=lambda: [0] * len(BUCKETS))
+    count: int = 0
+    seconds: float = 0.0
+    rows: int = 0
+
+    def observe(self, seconds: float, rows: int = 0) -> None:
+        """Add one duration.
+
+        Args:
+            seconds (float): duration
+            rows (int, optional): number of rows processed. Defaults to 0.
+        """
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.seconds += seconds
+        self.rows += rows
+
+
+class Registry:
+    """Thread safe collection of stage histograms."""
+
+    def __init__(self) -> None:
+        """Initialize the Registry class."""
+        self._histograms: dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        """Pickle the histograms without the lock.
+
+        Returns:
+            dict: histograms
+        """
+        with self._lock:
+            return {"histograms": dict(self._histograms)}
+
+    def __setstate__(self, state: dict) -> None:
+        """Restore the histograms with a new lock.
+
+        Args:
+            state (dict): histograms
+        """
+        self._histograms = state["histograms"]
+        self._lock = threading.Lock()
+
+    def merge(self, observations: list[Observation]) -> None:
+        """Add the observations of a run.
+
+        Args:
+            observations (list[Observation]): observations
+        """
+        with self._lock:
+            for obs in observations:
+                histogram = self._histograms.setdefault(obs.stage, Histogram())
+                histogram.observe(obs.seconds, obs.rows)
+
+    def summary(self) -> dict[str, dict]:
+        """Get count, total seconds and rows of every stage.
+
+        Returns:
+            dict[str, dict]: summary by stage name
+        """
+        with self._lock:
+            return {
+                stage: {
+                    "count": hist.count,
+                    "seconds": hist.seconds,
+                    "rows": hist.rows,
+                }
+                for stage, hist in sorted(self._histograms.items())
+            }
+
+    def render(self, prefix: str = "planner") -> str:
+        """Render all histograms in the Prometheus text format.
+
+        Args:
+            prefix (str, optional): metric name prefix.
+                Defaults to "planner".
+
+        Returns:
+            str: metrics text
+        """
+        lines = [
+            f"# HELP {prefix}_stage_seconds Duration of pipeline stages.",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        rows = [
+            f"# HELP {prefix}_stage_rows_total Rows processed by stages.",
+            f"# TYPE {prefix}_stage_rows_total counter",
+        ]
+        with self._lock:
+            for stage, hist in sorted(self._histograms.items()):
+                label = f'stage="{stage}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS, hist.counts):
+                    cumulative += count
+                    lines.append(
+                        f"{prefix}_stage_seconds_bucket"
+                        f'{{{label},le="{bound}"}} {cumulative}'
+                    )
+                lines += [
+                    f'{prefix}_stage_seconds_bucket{{{label},le="+Inf"}}'
+                    f" {hist.count}",
+                    f"{prefix}_stage_seconds_sum{{{label}}} {hist.seconds}",
+                    f"{prefix}_stage_seconds_count{{{label}}} {hist.count}",
+                ]
+                rows.append(f"{prefix}_stage_rows_total{{{label}}} {hist.rows}")
+        return "\n".join(lines + rows) + "\n"
@@ -0,0 +1,356 @@
+"""Columnar representation of the events of a timetable.
+
+Used by the excel planner (src/go.py) and the dash planner
+(dash_app/callbacks.py). Every event is one index into a set of numpy
+arrays, strings are interned into tables of unique values.
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from src.lanes import assign_lanes
+
+WEEKDAYS = {
+    "Montag": 0,
+    "Dienstag": 1,
+    "Mittwoch": 2,
+    "Donnerstag": 3,
+    "Freitag": 4,
+    "Samstag": 5,
+    "Sonntag": 6,
+}
+RESOLUTIONS = (5, 15, 30, 60)
+
+
+def to_minutes(times: pd.Series) -> np.ndarray:
+    """Convert "H:MM" or "HH:MM:SS" times to minutes since midnight.
+
+    Args:
+        times (pd.Series): times as strings or datetime.time
+
+    Returns:
+        np.ndarray: minutes since midnight
+    """
+    parts = times.astype(str).str.split(":", expand=True)
+    return (60 * parts[0].astype(int) + parts[1].astype(int)).to_numpy(
+        dtype=np.int32
+    )
+
+
+@dataclass(frozen=True)
+class SlotIndex:
+    """Rows of equal length from the start to the end of a day.
+
+    The slot bounds are computed once, so the times of all events of a plan
+    are mapped to rows with one search.
+    """
+
+    day_start: int = 8 * 60
+    day_end: int = 24 * 60
+    resolution: int = 30
+    bounds: np.ndarray = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        """Check the settings and compute the slot bounds.
+
+        Raises:
+            ValueError: if the resolution is not one of RESOLUTIONS or the
+                day is not a whole number of slots within 0:00 to 24:00
+        """
+        if self.resolution not in RESOLUTIONS:
+            raise ValueError(
+                f"Resolution must be one of {RESOLUTIONS} minutes, "
+                f"got {self.resolution}"
+            )
+        if not 0 <= self.day_start < self.day_end <= 24 * 60 or (
+            (self.day_end - self.day_start) % self.resolution
+        ):
+            raise ValueError(
+                f"Day from {self.day_start} to {self.day_end} is not a whole"
+                f" number of {self.resolution} minute slots"
+            )
+        bounds = np.arange(
+            self.day_start, self.day_end + 1, self.resolution, dtype=np.int32
+        )
+        object.__setattr__(self, "bounds", bounds)
+
+    def __len__(self) -> int:
+        """Get the number of slots.
+
+        Returns:
+            int: number of slots
+        """
+        return len(self.bounds) - 1
+
+    def rows(self, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+        """Get the first and last slot of events.
+
+        An event covers every slot it overlaps. Times outside of the day
+        are clipped to its first or last slot.
+
+        Args:
+            start (np.ndarray): start times in minutes since midnight
+            end (np.ndarray): end times in minutes since midnight
+
+        Returns:
+            np.ndarray: (first_slot, last_slot) of every event
+        """
+        last_slot = len(self) - 1
+        first = np.clip(
+            np.searchsorted(self.bounds, start, side="right") - 1, 0, last_slot
+        )
+        last = np.clip(
+            np.searchsorted(self.bounds, end, side="left") - 1,
+            first,
+            last_slot,
+        )
+        return np.column_stack([first, last])
+
+    def ticks(self, every: int | None = None) -> tuple[np.ndarray, list]:
+        """Get slot bounds as axis ticks.
+
+        Args:
+            every (int | None, optional): minutes between ticks, a multiple
+                of the resolution. Defaults to the resolution.
+
+        Returns:
+            tuple[np.ndarray, list]: minutes since midnight and "HH:MM"
+                labels of the ticks
+        """
+        minutes = self.bounds[:: (every or self.resolution) // self.resolution]
+        return minutes, [f"{m // 60:02}:{m % 60:02}" for m in minutes.tolist()]
+
+
+@dataclass(frozen=True)
+class Interned:
+    """Strings stored as codes into a table of unique values."""
+
+    codes: np.ndarray
+    values: np.ndarray
+
+    @classmethod
+    def from_values(cls, values) -> "Interned":
+        """Intern a sequence of strings.
+
+        Args:
+            values: strings, missing values become ""
+
+        Returns:
+            Interned: interned strings
+        """
+        values = pd.Series(values, dtype=object).fillna("").astype(str)
+        codes, uniques = pd.factorize(values)
+        return cls(codes.astype(np.int32), np.asarray(uniques, dtype=object))
+
+    def __getitem__(self, i: int) -> str:
+        return self.values[self.codes[i]]
+
+    def decode(self, idx: np.ndarray | None = None) -> np.ndarray:
+        """Get the string of every event.
+
+        Args:
+            idx (np.ndarray | None, optional): indices of the events to
+                decode. Defaults to all events.
+
+        Returns:
+            np.ndarray: strings
+        """
+        return self.values[self.codes if idx is None else self.codes[idx]]
+
+    def take(self, order: np.ndarray) -> "Interned":
+        """Reorder the events.
+
+        Args:
+            order (np.ndarray): new order of the events
+
+        Returns:
+            Interned: reordered strings sharing the same table
+        """
+        return Interned(self.codes[order], self.values)
+
+    def assign(self, idx: np.ndarray, other: "Interned") -> "Interned":
+        """Replace the strings of some events.
+
+        Args:
+            idx (np.ndarray): indices of the events to replace
+            other (Interned): new strings, one per index
+
+        Returns:
+            Interned: strings with the table extended by the new values
+        """
+        codes = self.codes.copy()
+        codes[idx] = other.codes + len(self.values)
+        return Interned(codes, np.concatenate([self.values, other.values]))
+
+
+@dataclass
+class ScheduleFrame:
+    """Struct of arrays holding all events of a timetable.
+
+    start and end are minutes since midnight. lane and width are filled by
+    layout(): the lane of every event and the number of lanes of its
+    overlap group.
+    """
+
+    day: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    tutor: Interned
+    subject: Interned
+    subject2: Interned
+    location: Interned
+    room: Interned
+    color: Interned
+    lane: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int32))
+    width: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int32))
+
+    def __len__(self) -> int:
+        return len(self.day)
+
+    @classmethod
+    def from_timetable(
+        cls, df: pd.DataFrame, default_colors: dict[str, str]
+    ) -> "ScheduleFrame":
+        """Create the frame from the timetable of the dash app.
+
+        Args:
+            df (pd.DataFrame): timetable with the columns Tag, Startzeit,
+                Endzeit, Tutor:in, Schwerpunkt, Ort, Raum and color
+            default_colors (dict[str, str]): color of every Ort, used if
+                an event has no color
+
+        Returns:
+            ScheduleFrame: events
+        """
+        day = df["Tag"].map(WEEKDAYS)
+        assert not day.isna().any()
+        color = df["color"].fillna(df["Ort"].map(default_colors))
+        return cls(
+            day=day.to_numpy(dtype=np.int8),
+            start=to_minutes(df["Startzeit"]),
+            end=to_minutes(df["Endzeit"]),
+            tutor=Interned.from_values(df["Tutor:in"]),
+            subject=Interned.from_values(df["Schwerpunkt"]),
+            subject2=Interned.from_values([""] * df.shape[0]),
+            location=Interned.from_values(df["Ort"]),
+            room=Interned.from_values(df["Raum"]),
+            color=Interned.from_values(color),
+        )
+
+    @classmethod
+    def from_liste(
+        cls, df: pd.DataFrame, colors: dict[str, str]
+    ) -> "ScheduleFrame":
+        """Create the frame from the sheet "Liste" of the excel planner.
+
+        Args:
+            df (pd.DataFrame): events with the columns day, start, end,
+                tutor, two knowledge areas and location
+            colors (dict[str, str]): color of every location
+
+        Returns:
+            ScheduleFrame: events
+        """
+        day, start, end, tutor, sp1, sp2, location = df.columns
+        day = df[day].astype(str).map(WEEKDAYS)
+        assert not day.isna().any()
+        location = Interned.from_values(df[location])
+        color = Interned.from_values([colors[loc] for loc in location.values])
+        return cls(
+            day=day.to_numpy(dtype=np.int8),
+            start=to_minutes(df[start]),
+            end=to_minutes(df[end]),
+            tutor=Interned.from_values(df[tutor]),
+            subject=Interned.from_values(df[sp1]),
+            subject2=Interned.from_values(df[sp2]),
+            location=location,
+            room=Interned.from_values([""] * df.shape[0]),
+            color=Interned(color.codes[location.codes], color.values),
+        )
+
+    def take(self, order: np.ndarray) -> "ScheduleFrame":
+        """Reorder the events.
+
+        Args:
+            order (np.ndarray): new order of the events
+
+        Returns:
+            ScheduleFrame: reordered events
+        """
+        return ScheduleFrame(
+            day=self.day[order],
+            start=self.start[order],
+            end=self.end[order],
+            tutor=self.tutor.take(order),
+            subject=self.subject.take(order),
+            subject2=self.subject2.take(order),
+            location=self.location.take(order),
+            room=self.room.take(order),
+            color=self.color.take(order),
+            lane=self.lane[order] if len(self.lane) else self.lane,
+            width=self.width[order] if len(self.width) else self.width,
+        )
+
+    def assign(
+        self, idx: np.ndarray, other: "ScheduleFrame"
+    ) -> "ScheduleFrame":
+        """Replace some events, keeping the order of all others.
+
+        lane and width are copied unchanged, call layout() for the weekdays
+        of the old and new events afterwards.
+
+        Args:
+            idx (np.ndarray): indices of the events to replace
+            other (ScheduleFrame): new events, one per index
+
+        Returns:
+            ScheduleFrame: events with the replacements
+        """
+        arrays = {}
+        for name in ("day", "start", "end", "lane", "width"):
+            arrays[name] = getattr(self, name).copy()
+            if name in ("day", "start", "end"):
+                arrays[name][idx] = getattr(other, name)
+        return ScheduleFrame(
+            tutor=self.tutor.assign(idx, other.tutor),
+            subject=self.subject.assign(idx, other.subject),
+            subject2=self.subject2.assign(idx, other.subject2),
+            location=self.location.assign(idx, other.location),
+            room=self.room.assign(idx, other.room),
+            color=self.color.assign(idx, other.color),
+            **arrays,
+        )
+
+    def layout(self, days: np.ndarray | None = None) -> np.ndarray:
+        """Assign lanes to the events, placing overlapping ones side by side.
+
+        Args:
+            days (np.ndarray | None, optional): only lay out the events on
+                these weekdays, the others keep their lanes. Defaults to all
+                weekdays.
+
+        Returns:
+            np.ndarray: indices of the laid out events
+        """
+        if days is None:
+            self.lane, self.width = assign_lanes(self.start, self.end, self.day)
+            return np.arange(len(self))
+        idx = np.flatnonzero(np.isin(self.day, days))
+        self.lane[idx], self.width[idx] = assign_lanes(
+            self.start[idx], self.end[idx], self.day[idx]
+        )
+        return idx
+
+    def day_lanes(self, n_days: int = len(WEEKDAYS)) -> np.ndarray:
+        """Get the number of lanes every weekday needs.
+
+        Args:
+            n_days (int, optional): number of weekdays. Defaults to 7.
+
+        Returns:
+            np.ndarray: number of lanes of every weekday, 0 without events
+        """
+        lanes = np.zeros(n_days, dtype=np.int32)
+        np.maximum.at(lanes, self.day, self.width)
+        return lanes